@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='square_sync_error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='square_sync_status',
+            field=models.CharField(choices=[('idle', 'Idle'), ('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed')], default='idle', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0003_square_sync_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='square_merchant_id',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+    ]
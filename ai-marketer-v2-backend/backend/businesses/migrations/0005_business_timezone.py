@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0004_square_merchant_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='timezone',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
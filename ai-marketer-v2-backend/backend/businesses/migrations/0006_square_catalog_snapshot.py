@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0005_business_timezone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='square_catalog_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='SquareCatalogObject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.CharField(max_length=64)),
+                ('object_type', models.CharField(max_length=32)),
+                ('version', models.BigIntegerField(default=0)),
+                ('is_deleted', models.BooleanField(default=False)),
+                ('data', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='square_catalog_objects', to='businesses.business')),
+            ],
+            options={
+                'unique_together': {('business', 'object_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:17
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copy of sales.products.normalize_product_name as of this migration, so later changes don't alter it
+VARIATION_SUFFIX_PATTERN = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]\s*$')
+SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+
+def normalize_product_name(name):
+    if not name:
+        return ''
+
+    key = unicodedata.normalize('NFKC', name).casefold()
+
+    while True:
+        stripped = VARIATION_SUFFIX_PATTERN.sub('', key)
+        if stripped == key or not stripped.strip():
+            break
+        key = stripped
+
+    return SEPARATOR_PATTERN.sub(' ', key).strip()
+
+
+def backfill_product_keys(apps, schema_editor):
+    """Set product_key on existing catalog snapshot items."""
+    SquareCatalogObject = apps.get_model('businesses', 'SquareCatalogObject')
+    catalog_objects = list(SquareCatalogObject.objects.filter(object_type='ITEM'))
+    for catalog_object in catalog_objects:
+        catalog_object.product_key = normalize_product_name(catalog_object.data.get('item_data', {}).get('name'))
+    SquareCatalogObject.objects.bulk_update(catalog_objects, ['product_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0006_square_catalog_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='squarecatalogobject',
+            name='product_key',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_product_keys, migrations.RunPython.noop),
+    ]
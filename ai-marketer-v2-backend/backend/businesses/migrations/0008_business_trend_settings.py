@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0007_catalog_object_product_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='trend_smoothing_factor',
+            field=models.FloatField(default=0.1),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='trend_threshold',
+            field=models.FloatField(default=0.05),
+        ),
+        migrations.AddField(
+            model_name='business',
+            name='trend_window_days',
+            field=models.PositiveSmallIntegerField(default=14),
+        ),
+    ]
@@ -2,6 +2,7 @@
 from django.conf import settings
 from django.db import models
 
+from config.constants import SQUARE_SYNC_STATUS_OPTIONS
 from users.models import User
 
 def business_logo_path(instance, filename):
@@ -22,8 +23,36 @@ class Business(models.Model):
     vibe = models.CharField(max_length=32, blank=True, null=True)  # Store vibe or theme of the business
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="businesses")
     square_access_token = models.CharField(max_length=255, blank=True, null=True)  # Store Square access token
+    square_merchant_id = models.CharField(max_length=64, blank=True, null=True, db_index=True)  # Square merchant the token belongs to, used to route webhooks
     last_square_sync_at = models.DateTimeField(null=True, blank=True)  # Store last sync time with Square
+    square_catalog_synced_at = models.DateTimeField(null=True, blank=True)  # Square time the catalog snapshot is current up to
+    square_sync_status = models.CharField(max_length=10, choices=SQUARE_SYNC_STATUS_OPTIONS, default='idle')  # State of the background Square sync
+    square_sync_error = models.TextField(blank=True, null=True)  # Error message of the last failed sync
+    timezone = models.CharField(max_length=64, blank=True, null=True)  # IANA timezone used to bucket sales into days, defaults to the Square location's
+    trend_window_days = models.PositiveSmallIntegerField(default=14)  # Days product sales trends are measured over
+    trend_smoothing_factor = models.FloatField(default=0.1)  # EMA weight of each new day (0-1)
+    trend_threshold = models.FloatField(default=0.05)  # Relative change below which a product trend is flat
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return self.name or "Unnamed Business"
\ No newline at end of file
+        return self.name or "Unnamed Business"
+
+class SquareCatalogObject(models.Model):
+    """
+    Snapshot of a Square catalog item or category, kept up to date incrementally
+    so pages listing the menu don't have to fetch the whole catalog from Square.
+    """
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="square_catalog_objects")
+    object_id = models.CharField(max_length=64)
+    object_type = models.CharField(max_length=32)  # ITEM or CATEGORY
+    product_key = models.CharField(max_length=255, blank=True, default='')  # Normalized item name (see sales.products)
+    version = models.BigIntegerField(default=0)
+    is_deleted = models.BooleanField(default=False)
+    data = models.JSONField()  # Catalog object as returned by Square (items include their variations)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['business', 'object_id']
+
+    def __str__(self):
+        return f"{self.business} - {self.object_type} {self.object_id}"
@@ -1,4 +1,5 @@
 # backend/businesses/serializers.py
+import pytz
 from rest_framework import serializers
 
 from .models import Business
@@ -8,7 +9,10 @@ class BusinessSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Business
-        fields = ['id', 'name', 'logo', 'category', 'target_customers', 'vibe']
+        fields = [
+            'id', 'name', 'logo', 'category', 'target_customers', 'vibe', 'timezone',
+            'trend_window_days', 'trend_smoothing_factor', 'trend_threshold',
+        ]
         read_only_fields = ['id']
 
     def validate_name(self, value):
@@ -36,6 +40,30 @@ class BusinessSerializer(serializers.ModelSerializer):
         if value and len(value) > 32:
             raise serializers.ValidationError("Vibe description cannot exceed 32 characters.")
         return value
+
+    def validate_timezone(self, value):
+        """Validate that timezone is a known IANA timezone name."""
+        if value and value not in pytz.all_timezones_set:
+            raise serializers.ValidationError("Timezone must be a valid IANA timezone name (e.g. Australia/Brisbane).")
+        return value
+
+    def validate_trend_window_days(self, value):
+        """Validate that trends are measured over 2 to 30 days (the product performance window)."""
+        if not 2 <= value <= 30:
+            raise serializers.ValidationError("Trend window must be between 2 and 30 days.")
+        return value
+
+    def validate_trend_smoothing_factor(self, value):
+        """Validate that the EMA smoothing factor is in (0, 1]."""
+        if not 0 < value <= 1:
+            raise serializers.ValidationError("Smoothing factor must be greater than 0 and at most 1.")
+        return value
+
+    def validate_trend_threshold(self, value):
+        """Validate that the flat trend threshold is in [0, 1]."""
+        if not 0 <= value <= 1:
+            raise serializers.ValidationError("Trend threshold must be between 0 and 1.")
+        return value
     
 class SquareItemVariationSerializer(serializers.Serializer):
     name = serializers.CharField()
@@ -0,0 +1,132 @@
+# backend/businesses/tasks.py
+import logging
+
+from celery import shared_task
+from django.core.cache import cache
+
+from .models import Business, SquareCatalogObject
+from sales.cache import bump_sales_cache_version
+from sales.models import SalesDataPoint, SquareOrderRecord, SquarePendingOrder, SquareSyncCursor
+from sales.tasks import schedule_product_performance_refresh
+from utils.square_api import refresh_square_catalog
+
+logger = logging.getLogger(__name__)
+
+# Longest a catalog refresh may stay queued or running before another can be scheduled
+SQUARE_CATALOG_REFRESH_LOCK_TIMEOUT = 60 * 5
+
+# Rows deleted per statement when removing the Square data of a disconnected business
+SQUARE_CLEANUP_BATCH_SIZE = 5000
+
+# How long the cleanup progress stays readable after the last update
+SQUARE_CLEANUP_PROGRESS_TIMEOUT = 60 * 60 * 24
+
+def _catalog_refresh_key(business_id):
+    return f"square:catalog:refresh:{business_id}"
+
+def schedule_square_catalog_refresh(business_id):
+    """Queue a catalog refresh unless one is already queued or running."""
+    try:
+        if cache.add(_catalog_refresh_key(business_id), "queued", timeout=SQUARE_CATALOG_REFRESH_LOCK_TIMEOUT):
+            refresh_square_catalog_task.delay(business_id)
+    except Exception as e:
+        logger.warning(f"Failed to schedule Square catalog refresh for business {business_id}: {e}")
+
+@shared_task
+def refresh_square_catalog_task(business_id):
+    """Refresh the Square catalog snapshot of one business."""
+    try:
+        business = Business.objects.filter(id=business_id).first()
+        if not business or not business.square_access_token:
+            return
+        refresh_square_catalog(business)
+    except Exception as e:
+        logger.error(f"❌ Square catalog refresh failed for business {business_id}: {e}", exc_info=True)
+    finally:
+        cache.delete(_catalog_refresh_key(business_id))
+
+def _cleanup_progress_key(business_id):
+    return f"square:cleanup:{business_id}"
+
+def _square_data_querysets(business_id):
+    """Square-originated rows of a business, by model."""
+    return {
+        "sales_data_points": SalesDataPoint.objects.filter(business_id=business_id, source='square'),
+        "order_records": SquareOrderRecord.objects.filter(business_id=business_id),
+        "pending_orders": SquarePendingOrder.objects.filter(business_id=business_id),
+        "sync_cursors": SquareSyncCursor.objects.filter(business_id=business_id),
+        "catalog_objects": SquareCatalogObject.objects.filter(business_id=business_id),
+    }
+
+def get_square_cleanup_progress(business_id):
+    """Progress of the Square data cleanup of a business, or None when none ran recently."""
+    try:
+        return cache.get(_cleanup_progress_key(business_id))
+    except Exception as e:
+        logger.warning(f"Square cleanup progress unavailable: {e}")
+        return None
+
+def is_square_cleanup_running(business_id):
+    progress = get_square_cleanup_progress(business_id)
+    return bool(progress) and progress["status"] in ('queued', 'running')
+
+def _set_cleanup_progress(business_id, **progress):
+    try:
+        cache.set(_cleanup_progress_key(business_id), progress, timeout=SQUARE_CLEANUP_PROGRESS_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Failed to save Square cleanup progress for business {business_id}: {e}")
+
+def schedule_square_data_cleanup(business_id):
+    """
+    Queue the removal of the Square data of a disconnected business.
+    Only rows that exist now are deleted, so data of a later reconnect is never touched.
+    """
+    max_ids = {
+        name: queryset.order_by('-id').values_list('id', flat=True).first() or 0
+        for name, queryset in _square_data_querysets(business_id).items()
+    }
+    _set_cleanup_progress(business_id, status='queued', deleted=0, total=None)
+    cleanup_square_data_task.delay(business_id, max_ids)
+
+@shared_task
+def cleanup_square_data_task(business_id, max_ids):
+    """
+    Delete the Square data of a disconnected business in bounded primary-key ranges.
+
+    Every batch is one DELETE of at most SQUARE_CLEANUP_BATCH_SIZE rows committed on
+    its own, using _raw_delete so rows are never loaded into Python. None of these
+    rows are referenced by other tables (uploaded rows are not touched), so the
+    collector's cascade handling isn't needed.
+    """
+    querysets = {
+        name: queryset.filter(id__lte=max_ids.get(name, 0))
+        for name, queryset in _square_data_querysets(business_id).items()
+    }
+    total = sum(queryset.count() for queryset in querysets.values())
+    deleted = 0
+    _set_cleanup_progress(business_id, status='running', deleted=deleted, total=total)
+
+    try:
+        for name, queryset in querysets.items():
+            last_id = 0
+            while True:
+                batch_ids = list(
+                    queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:SQUARE_CLEANUP_BATCH_SIZE]
+                )
+                if not batch_ids:
+                    break
+
+                batch = queryset.filter(id__gt=last_id, id__lte=batch_ids[-1])
+                deleted += batch._raw_delete(batch.db)
+                last_id = batch_ids[-1]
+                _set_cleanup_progress(business_id, status='running', deleted=deleted, total=total)
+    except Exception as e:
+        logger.error(f"❌ Square data cleanup failed for business {business_id}: {e}", exc_info=True)
+        _set_cleanup_progress(business_id, status='failed', deleted=deleted, total=total, error=str(e))
+        return
+    finally:
+        bump_sales_cache_version(business_id)
+        schedule_product_performance_refresh(business_id)
+
+    _set_cleanup_progress(business_id, status='completed', deleted=deleted, total=total)
+    logger.info(f"✅ Removed {deleted} Square rows of business {business_id}")
@@ -1,3 +1,49 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from sales.models import SalesDataPoint
+from users.models import User
+
+from .models import Business
+from .tasks import cleanup_square_data_task, schedule_square_data_cleanup
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SquareDataCleanupTest(TestCase):
+    def setUp(self):
+        self.business = self.create_business("owner@example.com")
+        self.other = self.create_business("other@example.com")
+
+    def tearDown(self):
+        cache.clear()
+
+    def create_business(self, email):
+        user = User.objects.create_user(email=email, name="Owner", password="password")
+        return Business.objects.create(name="Test Cafe", owner=user)
+
+    def create_point(self, business, product_name):
+        return SalesDataPoint.objects.create(
+            business=business, date=date(2025, 3, 10), product_name=product_name,
+            product_price=Decimal('5.00'), units_sold=1, revenue=Decimal('5.00'), source='square'
+        )
+
+    @mock.patch('businesses.tasks.schedule_product_performance_refresh')
+    @mock.patch('businesses.tasks.cleanup_square_data_task.delay')
+    def test_cleanup_only_covers_rows_of_the_business(self, delay, refresh):
+        old = self.create_point(self.business, "Latte")
+        other = self.create_point(self.other, "Latte")
+
+        schedule_square_data_cleanup(self.business.id)
+        (_, max_ids), _ = delay.call_args
+        self.assertEqual(max_ids['sales_data_points'], old.id)
+
+        # Synced after the disconnect, by the new connection
+        new = self.create_point(self.business, "Mocha")
+        cleanup_square_data_task(self.business.id, max_ids)
+
+        self.assertEqual(
+            set(SalesDataPoint.objects.values_list('id', flat=True)), {new.id, other.id}
+        )
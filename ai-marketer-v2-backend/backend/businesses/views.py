@@ -6,7 +6,7 @@ import uuid
 import time
 import hmac
 import hashlib
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -23,18 +23,24 @@ from rest_framework.views import APIView
 
 from .models import Business
 from .serializers import BusinessSerializer
+from .tasks import get_square_cleanup_progress, is_square_cleanup_running, schedule_square_data_cleanup
 from posts.models import Post
-from sales.models import SalesDataPoint
+from sales.cache import bump_sales_cache_version
+from sales.tasks import schedule_product_performance_refresh, sync_square_sales_task
+from sales.trends import get_trend_settings
 from social.models import SocialMedia
 
 from utils.discord_api import upload_image_file_to_discord
 from utils.square_api import (
+    batch_update_square_items,
+    build_square_item_update,
     exchange_code_for_token,
-    fetch_and_save_square_sales_data,
     get_auth_url_values,
+    get_square_catalog_objects,
     get_square_client,
     get_square_locations,
     process_square_item,
+    save_square_catalog_objects,
 )
 
 User = get_user_model()
@@ -179,7 +185,12 @@ class BusinessDetailView(APIView):
         else:
             serializer = BusinessSerializer(business, data=request.data, partial=partial, context={'request': request})
             if serializer.is_valid():
+                previous_trend_settings = get_trend_settings(business)
                 serializer.save()
+
+                # Stored product trends were computed with the previous settings
+                if get_trend_settings(business) != previous_trend_settings:
+                    schedule_product_performance_refresh(business.id)
                 return Response(serializer.data)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -245,6 +256,11 @@ def square_oauth_callback(request):
     except User.DoesNotExist:
         logger.error(f"User {user_id} not found")
         return redirect(f"{settings.FRONTEND_BASE_URL}/settings/square?error=user_not_found")
+
+    # A cleanup still running would delete the data the new connection syncs
+    if is_square_cleanup_running(business.id):
+        logger.warning(f"Square data cleanup still running for business {business.id}")
+        return redirect(f"{settings.FRONTEND_BASE_URL}/settings/square?error=cleanup_running")
     
     # Exchange code for access token
     logger.info("Exchanging code for access token")
@@ -256,16 +272,21 @@ def square_oauth_callback(request):
 
     # Save the access token to the business
     business.square_access_token = token_response['access_token']
+    business.square_merchant_id = token_response.get('merchant_id')
     business.save()
 
+    # Cached sales payloads carry square_connected, so they are invalidated even if the first sync finds nothing
+    bump_sales_cache_version(business.id)
+
     logger.info(f"✅ Access token saved for business: {business.name}")
 
-    # After saving access token, fetch and save the sales data
+    # After saving access token, fetch and save the sales data in the background
     try:
-        fetch_and_save_square_sales_data(business)
-        logger.info("✅ Sales data fetched successfully")
+        Business.objects.filter(id=business.id).update(square_sync_status='queued')
+        sync_square_sales_task.delay(business.id)
+        logger.info("✅ Sales data sync queued")
     except Exception as e:
-        logger.error(f"⚠️ Error fetching Square sales data: {e}")
+        logger.error(f"⚠️ Error queueing Square sales data sync: {e}")
 
     logger.info("🎉 Square OAuth callback completed successfully")
     return redirect(f"{settings.FRONTEND_BASE_URL}/settings/square?success=true")
@@ -283,22 +304,39 @@ class SquareViewSet(viewsets.ViewSet):
             logger.warning("⚠️ User %s attempted to access posts without a business", request.user.email)
             return Response({"error": "Business not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        cleanup = get_square_cleanup_progress(business.id)
+
         client = get_square_client(business)
         if not client:
-            return Response({"square_connected": False, "business_name": None})
+            return Response({"square_connected": False, "business_name": None, "cleanup": cleanup})
+
+        sync_status = {
+            "last_sync_at": business.last_square_sync_at,
+            "sync_status": business.square_sync_status,
+            "sync_error": business.square_sync_error,
+            "cleanup": cleanup,
+        }
         
         locations = get_square_locations(client)
         if not locations:
-            return Response({"square_connected": True, "business_name": None})
+            return Response({"square_connected": True, "business_name": None, **sync_status})
         
         return Response({
             "square_connected": True,
-            "business_name": locations[0].get("name")
+            "business_name": locations[0].get("name"),
+            **sync_status
         })
 
     @action(detail=False, methods=['post'])
     def connect(self, request):
         """Connect Square integration for the authenticated user's business."""
+        business = Business.objects.filter(owner=request.user).first()
+        if business and is_square_cleanup_running(business.id):
+            return Response(
+                {"error": "Data from the previous Square connection is still being removed. Please try again shortly."},
+                status=status.HTTP_409_CONFLICT
+            )
+
         auth_url_values = get_auth_url_values()
 
         secure_state = generate_secure_state(request.user.id)
@@ -326,11 +364,15 @@ class SquareViewSet(viewsets.ViewSet):
         
         # Remove the access token and disconnect the business
         business.square_access_token = None
+        business.square_merchant_id = None
         business.last_square_sync_at = None
+        business.square_catalog_synced_at = None
+        business.square_sync_status = 'idle'
+        business.square_sync_error = None
         business.save()
 
-        # Delete Square-originated sales data points
-        SalesDataPoint.objects.filter(business=business, source="square").delete()
+        # Square-originated data can span years, so it is removed in the background
+        schedule_square_data_cleanup(business.id)
         
         return Response({"message": "Square integration deleted successfully"}, status=status.HTTP_200_OK)
     
@@ -341,8 +383,7 @@ class SquareViewSet(viewsets.ViewSet):
         if not business:
             return Response({"error": "Business not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        client = get_square_client(business)
-        if not client:
+        if not business.square_access_token:
             return Response({
                 "square_connected": False,
                 "items": [],
@@ -350,36 +391,21 @@ class SquareViewSet(viewsets.ViewSet):
             }, status=status.HTTP_200_OK)
 
         try:
-            # Get catalog items
-            catalog_api = client.catalog
-            
-            # Get categories
-            categories_response = catalog_api.list_catalog(
-                cursor=None,
-                types=["CATEGORY"]
-            )
-            
-            categories = []
-            if categories_response.is_success():
-                for obj in categories_response.body.get("objects", []):
-                    if obj.get("type") == "CATEGORY" and "category_data" in obj:
-                        categories.append({
-                            "id": obj["id"],
-                            "name": obj["category_data"]["name"]
-                        })
-            
-            # Get items
-            items_response = catalog_api.list_catalog(
-                cursor=None,
-                types=["ITEM"]
-            )
+            # Served from the catalog snapshot, refreshed incrementally from Square
+            categories = [
+                {
+                    "id": obj["id"],
+                    "name": obj["category_data"]["name"]
+                }
+                for obj in get_square_catalog_objects(business, "CATEGORY")
+                if "category_data" in obj
+            ]
 
             items = []
-            if items_response.is_success():
-                for obj in items_response.body.get("objects", []):
-                    item = process_square_item(obj, output_format="detail")
-                    if item:
-                        items.append(item)
+            for obj in get_square_catalog_objects(business, "ITEM"):
+                item = process_square_item(obj, output_format="detail")
+                if item:
+                    items.append(item)
             
             return Response({
                 "square_connected": True,
@@ -415,55 +441,17 @@ class SquareViewSet(viewsets.ViewSet):
                 logger.error(f"Failed to retrieve item: {item_response.errors}")
                 return Response({"error": "Failed to retrieve item details"}, status=status.HTTP_400_BAD_REQUEST)
 
-            current_item = item_response.body["object"]
-            latest_version = current_item["version"]
-            current_item_data = current_item.get("item_data", {})
-            
-            # Get variation versions
-            variation_versions = {
-                variation["id"]: variation["version"]
-                for variation in current_item_data.get("variations", [])
-                if "id" in variation and "version" in variation
-            }
-            
-            raw_variations = request.data.get("variations", [])
-            formatted_variations = [
-                {
-                    "type": "ITEM_VARIATION",
-                    "id": v["id"],
-                    "version": variation_versions.get(v["id"]),
-                    "item_variation_data": {
-                        "item_id": item_id,
-                        "name": v["name"],
-                        "pricing_type": "FIXED_PRICING",
-                        "price_money": v["price_money"],
-                        **{k:v for k,v in current_item_data.get("variations", [])[0].get("item_variation_data", {}).items() 
-                        if k not in ["name", "pricing_type", "price_money"]}
-                    }
-                }
-                for v in raw_variations
-            ]
-
             # Prepare the updated item
             updated_item = {
                 "idempotency_key": str(uuid.uuid4()),
-                "object": {
-                    "type": "ITEM",
-                    "id": item_id,
-                    "version": latest_version,
-                    "item_data": {
-                        **current_item_data,
-                        "name": request.data.get("name", current_item_data.get("name")),
-                        "description": request.data.get("description", current_item_data.get("description", "")),
-                        "variations": formatted_variations,
-                    }
-                }
+                "object": build_square_item_update(item_response.body["object"], request.data)
             }
             logger.debug(f"Update request: {updated_item}")
             
             update_response = catalog_api.upsert_catalog_object(body=updated_item)
             if update_response.is_success():
                 logger.info(f"Item {item_id} updated successfully")
+                save_square_catalog_objects(business, [update_response.body["catalog_object"]])
                 return Response({
                     "message": f"Item {item_id} updated successfully.",
                     "item": update_response.body
@@ -479,6 +467,43 @@ class SquareViewSet(viewsets.ViewSet):
             logger.error(f"Square item update error: {e}")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'], url_path='items/bulk')
+    def bulk_update_items(self, request):
+        """Update many menu items in Square at once (e.g. bulk price edits)."""
+        business = Business.objects.filter(owner=request.user).first()
+        if not business:
+            return Response({"error": "Business not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        if not business.square_access_token:
+            return Response({"error": "Square not connected"}, status=status.HTTP_400_BAD_REQUEST)
+
+        items = request.data.get("items")
+        if not isinstance(items, list) or not items:
+            return Response({"error": "items must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+        if any(not isinstance(item, dict) or not item.get("id") for item in items):
+            return Response({"error": "Every item requires an id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The same item twice would be written twice with the same version, and Square rejects the whole batch
+        duplicate_ids = [str(item_id) for item_id, count in Counter(item["id"] for item in items).items() if count > 1]
+        if duplicate_ids:
+            return Response(
+                {"error": f"Duplicate item ids: {', '.join(duplicate_ids)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            results = batch_update_square_items(business, items)
+        except Exception as e:
+            logger.error(f"Square bulk item update error: {e}")
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        updated = sum(1 for result in results if result["success"])
+        logger.info(f"Bulk updated {updated}/{len(results)} Square items for business {business.id}")
+        return Response({
+            "updated": updated,
+            "failed": len(results) - updated,
+            "results": results
+        }, status=status.HTTP_200_OK)
 
 def generate_secure_state(user_id):
     timestamp = str(int(time.time()))
@@ -7,6 +7,9 @@ ROLE_CHOICES = [
 
 DEFAULT_ROLE = "business_owner"
 
+# Timezone sales are bucketed in when neither the owner nor Square has set one (Used in utils/square_api.py)
+DEFAULT_BUSINESS_TIMEZONE = "Australia/Brisbane"
+
 # Social Media Platforms (Used in social/models.py & posts/models.py)
 SOCIAL_PLATFORMS = [
     {"key": "instagram", "label": "Instagram"},
@@ -43,4 +46,20 @@ PROMOTION_STATUS_OPTIONS = [
     ('upcoming', 'Upcoming'),
     ('ongoing', 'Ongoing'),
     ('ended', 'Ended'),
-]
\ No newline at end of file
+]
+
+# Promotion Suggestion Generation Job Status (Used in promotions/models.py & promotions/tasks.py)
+PROMOTION_GENERATION_STATUS_OPTIONS = [
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('completed', 'Completed'),
+    ('failed', 'Failed'),
+]
+
+# Square Sync Status (Used in businesses/models.py & sales/tasks.py)
+SQUARE_SYNC_STATUS_OPTIONS = [
+    ('idle', 'Idle'),
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('failed', 'Failed'),
+]
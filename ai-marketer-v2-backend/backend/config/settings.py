@@ -14,6 +14,7 @@ from datetime import timedelta
 import os
 from pathlib import Path
 
+from celery.schedules import crontab
 import dj_database_url
 from dotenv import load_dotenv
 
@@ -69,6 +70,19 @@ SQUARE_REDIRECT_URI = os.getenv("SQUARE_REDIRECT_URI")
 if not SQUARE_REDIRECT_URI:
     raise ValueError("SQUARE_REDIRECT_URI environment variable is not set.")
 
+# Number of Square locations synced in parallel for one business
+SQUARE_SYNC_MAX_WORKERS = int(os.getenv("SQUARE_SYNC_MAX_WORKERS", "4"))
+
+# How often every connected business is synced with Square in the background
+SQUARE_SYNC_INTERVAL_MINUTES = int(os.getenv("SQUARE_SYNC_INTERVAL_MINUTES", "60"))
+
+# Square order webhooks (optional, the endpoint rejects every event when the key is unset)
+SQUARE_WEBHOOK_SIGNATURE_KEY = os.getenv("SQUARE_WEBHOOK_SIGNATURE_KEY")
+SQUARE_WEBHOOK_URL = os.getenv("SQUARE_WEBHOOK_URL")  # Notification URL exactly as registered with Square
+
+# Seconds webhook order ids are collected before they are fetched and applied together
+SQUARE_WEBHOOK_COALESCE_SECONDS = int(os.getenv("SQUARE_WEBHOOK_COALESCE_SECONDS", "30"))
+
 FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL")
 if not FRONTEND_BASE_URL:
     raise ValueError("FRONTEND_BASE_URL environment variable is not set.")
@@ -199,6 +213,29 @@ DATABASES = {
     }
 }
 
+# Cache
+# Redis is already running for Celery, so reuse it for the shared cache
+REDIS_URL = os.getenv("REDIS_URL", os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0"))
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "ai-marketer",
+    }
+}
+
+# Celery beat schedule
+CELERY_BEAT_SCHEDULE = {
+    "sync-square-sales": {
+        "task": "sales.tasks.sync_all_square_sales_task",
+        "schedule": timedelta(minutes=SQUARE_SYNC_INTERVAL_MINUTES),
+    },
+    "refresh-product-performance": {
+        "task": "sales.tasks.refresh_all_product_performance_task",
+        "schedule": crontab(hour=3, minute=0),
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
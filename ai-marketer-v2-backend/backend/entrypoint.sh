@@ -8,6 +8,12 @@ if [ "$1" = "celery" ]; then
   return
 fi
 
+if [ "$1" = "celery-beat" ]; then
+  shift
+  exec celery -A config.celery_app.app beat "$@"
+  return
+fi
+
 ENV_FILE="/app/.env"
 echo "🚀 Starting AI Marketer Backend Service"
 
@@ -50,6 +56,10 @@ fi
 python manage.py create_admin
 echo "✓ Admin user setup completed"
 
+# Promotions created before their metrics were stored; a no-op once every promotion has them
+python manage.py refresh_promotion_metrics
+echo "✓ Promotion metrics setup done"
+
 echo "✅ Server starting"
 
 exec "$@"
@@ -0,0 +1,250 @@
+# promotions/analytics.py
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+import math
+
+from django.db.models import Sum
+from django.utils import timezone
+import numpy as np
+
+from sales.models import SalesDataPoint
+
+from .models import PromotionMetrics
+
+# Days before a promotion its sales are compared against
+SALES_CHANGE_LOOKBACK_DAYS = 30
+
+# Precision of the money fields of PromotionMetrics
+CENTS = Decimal('0.01')
+
+# Stored fields of PromotionMetrics, in the order they are exposed
+METRICS_FIELDS = [
+    'sold_count',
+    'sales_change',
+    'baseline_units',
+    'lift_percent',
+    'revenue',
+    'baseline_revenue',
+    'revenue_lift',
+    'confidence',
+    'product_breakdown',
+]
+
+def get_promotion_status(promotion, today=None):
+    """Status of a promotion based on the current date vs. its start and end dates."""
+    now = today or timezone.now().date()
+    if not promotion.start_date and not promotion.end_date:
+        return "ongoing"
+
+    if promotion.start_date and not promotion.end_date:
+        return "ongoing" if now >= promotion.start_date else "upcoming"
+
+    if promotion.start_date and promotion.end_date:
+        if now < promotion.start_date:
+            return "upcoming"
+        elif promotion.start_date <= now <= promotion.end_date:
+            return "ongoing"
+        else:
+            return "ended"
+
+    return "unknown"
+
+def get_promotion_products(promotion):
+    """Target products of a promotion with their performance category."""
+    # Return products with categories if product_data is available
+    if promotion.product_data:
+        return promotion.product_data
+
+    # Otherwise, convert from product_names (backward compatibility)
+    elif promotion.product_names:
+        return [{'name': name, 'category': 'average'} for name in promotion.product_names]
+
+    return []
+
+def _lookback_periods(start_date, promotion_days):
+    """
+    Periods as long as the promotion, going back from the day before it starts,
+    within the look-back window. Sales of the promotion are compared with their average.
+    """
+    before_start_date = start_date - timedelta(days=SALES_CHANGE_LOOKBACK_DAYS)
+    before_end_date = start_date - timedelta(days=1)
+
+    total_back_days = (before_end_date - before_start_date).days + 1
+    num_periods = max(1, total_back_days // promotion_days)
+
+    periods = []
+    for i in range(num_periods):
+        period_end = before_end_date - timedelta(days=i * promotion_days)
+        period_start = max(before_start_date, period_end - timedelta(days=promotion_days - 1))
+        if period_start <= period_end:
+            periods.append((period_start, period_end))
+    return periods
+
+def _empty_metrics(sold_count):
+    return {
+        'sold_count': sold_count,
+        'sales_change': None,
+        'baseline_units': None,
+        'lift_percent': None,
+        'revenue': None,
+        'baseline_revenue': None,
+        'revenue_lift': None,
+        'confidence': None,
+        'product_breakdown': [],
+    }
+
+def _change(current, periods, digits=1):
+    """
+    Change of a promotion total over the average of its look-back periods.
+    With no sales in the look-back periods, the whole total counts as the change.
+
+    Returns:
+        Tuple of (change, baseline)
+    """
+    if not periods:
+        return 0, None
+    baseline = sum(periods) / len(periods)
+    if baseline == 0:
+        return current, baseline
+    return round(current - baseline, digits), baseline
+
+def _money(value):
+    """Amount rounded to cents, or None."""
+    return Decimal(str(value)).quantize(CENTS) if value is not None else None
+
+def _confidence(current, periods):
+    """
+    How unusual the promotion is against the variation of its look-back periods, between 0 and 1.
+    This is the two-sided normal probability of the z-score, so 0.95 means the change
+    is about two standard deviations from the baseline. None with fewer than two periods.
+    """
+    if len(periods) < 2:
+        return None
+    deviation = float(np.std(periods, ddof=1))
+    if deviation == 0:
+        return 1.0 if current != periods[0] else 0.0
+    z_score = (current - float(np.mean(periods))) / deviation
+    return round(math.erf(abs(z_score) / math.sqrt(2)), 3)
+
+def compute_promotion_metrics(promotions, today=None):
+    """
+    Calculate the sales effect of each promotion against its look-back periods.
+
+    Daily units and revenue of every target product of every promotion are read in
+    a single grouped query. The range sums of each promotion are then taken from
+    cumulative daily totals, so the cost doesn't grow with the number of periods.
+
+    Returns:
+        Dict of promotion id -> metrics, with the fields of PromotionMetrics
+    """
+    today = today or timezone.now().date()
+    results = {}
+    pending = []
+
+    for promotion in promotions:
+        if get_promotion_status(promotion, today) == "upcoming":
+            results[promotion.id] = _empty_metrics(0)
+            continue
+
+        start_date = promotion.start_date
+        end_date = promotion.end_date if promotion.end_date and promotion.end_date < today else today
+        if (end_date - start_date).days + 1 < 1:
+            results[promotion.id] = _empty_metrics(0)
+            continue
+
+        product_names = list(dict.fromkeys(product['name'] for product in get_promotion_products(promotion)))
+        if not product_names:
+            results[promotion.id] = _empty_metrics(None)
+            continue
+
+        pending.append((promotion, product_names, start_date, end_date))
+
+    if not pending:
+        return results
+
+    first_day = min(start_date for _, _, start_date, _ in pending) - timedelta(days=SALES_CHANGE_LOOKBACK_DAYS)
+    last_day = max(end_date for _, _, _, end_date in pending)
+    num_days = (last_day - first_day).days + 1
+
+    rows = SalesDataPoint.objects.filter(
+        business_id__in={promotion.business_id for promotion, _, _, _ in pending},
+        product_name__in=set().union(*(product_names for _, product_names, _, _ in pending)),
+        date__range=[first_day, last_day]
+    ).values_list('business_id', 'product_name', 'date').annotate(
+        units=Sum('units_sold'),
+        revenue=Sum('revenue')
+    ).order_by()
+
+    # Cumulative daily units and revenue of each product, one slot per day from first_day
+    daily = defaultdict(lambda: np.zeros((2, num_days), dtype=np.float64))
+    for business_id, product_name, date, units, revenue in rows:
+        daily[(business_id, product_name)][:, (date - first_day).days] += (units, float(revenue))
+
+    cumulative = {
+        key: np.concatenate((np.zeros((2, 1)), np.cumsum(values, axis=1)), axis=1)
+        for key, values in daily.items()
+    }
+    no_sales = np.zeros((2, num_days + 1))
+
+    def totals_between(sums, period_start, period_end):
+        return sums[:, (period_end - first_day).days + 1] - sums[:, (period_start - first_day).days]
+
+    for promotion, product_names, start_date, end_date in pending:
+        periods = _lookback_periods(start_date, (end_date - start_date).days + 1)
+
+        product_sums = [cumulative.get((promotion.business_id, name), no_sales) for name in product_names]
+        promotion_sums = sum(product_sums)
+
+        units, revenue = totals_between(promotion_sums, start_date, end_date)
+        period_totals = [totals_between(promotion_sums, *period) for period in periods]
+        period_units = [int(total[0]) for total in period_totals]
+        period_revenue = [float(total[1]) for total in period_totals]
+
+        sales_change, baseline_units = _change(int(units), period_units)
+        revenue_lift, baseline_revenue = _change(round(float(revenue), 2), period_revenue, digits=2)
+
+        product_breakdown = []
+        for name, sums in zip(product_names, product_sums):
+            product_units, product_revenue = totals_between(sums, start_date, end_date)
+            product_periods = [totals_between(sums, *period) for period in periods]
+            product_change, product_baseline = _change(int(product_units), [int(total[0]) for total in product_periods])
+            product_breakdown.append({
+                'name': name,
+                'sold_count': int(product_units),
+                'baseline_units': round(product_baseline, 1) if product_baseline is not None else None,
+                'sales_change': product_change,
+                'revenue': round(float(product_revenue), 2),
+            })
+
+        results[promotion.id] = {
+            'sold_count': int(units),
+            'sales_change': sales_change,
+            'baseline_units': round(baseline_units, 1) if baseline_units is not None else None,
+            'lift_percent': round(100 * (units - baseline_units) / baseline_units, 1) if baseline_units else None,
+            'revenue': _money(float(revenue)),
+            'baseline_revenue': _money(baseline_revenue),
+            'revenue_lift': _money(revenue_lift),
+            'confidence': _confidence(int(units), period_units),
+            'product_breakdown': product_breakdown,
+        }
+
+    return results
+
+def refresh_promotion_metrics(promotions, today=None):
+    """Compute and store the metrics of promotions, replacing their previous metrics."""
+    promotions = list(promotions)
+    if not promotions:
+        return []
+
+    metrics = compute_promotion_metrics(promotions, today)
+    rows = [
+        PromotionMetrics(promotion_id=promotion_id, **values)
+        for promotion_id, values in metrics.items()
+    ]
+    return PromotionMetrics.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['promotion'],
+        update_fields=METRICS_FIELDS + ['computed_at']
+    )
@@ -0,0 +1,25 @@
+# backend/promotions/management/commands/refresh_promotion_metrics.py
+from django.core.management.base import BaseCommand
+
+from promotions.analytics import refresh_promotion_metrics
+from promotions.models import Promotion
+
+class Command(BaseCommand):
+    help = "Store the metrics of promotions that have none yet, or of every promotion with --all."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Recompute stored metrics too")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        promotions = Promotion.objects.order_by('id')
+        if not options['all']:
+            promotions = promotions.filter(metrics__isnull=True)
+
+        # Promotion ids are read up front, so stored metrics don't shift the batches
+        promotion_ids = list(promotions.values_list('id', flat=True))
+        batch_size = options['batch_size']
+        for i in range(0, len(promotion_ids), batch_size):
+            refresh_promotion_metrics(Promotion.objects.filter(id__in=promotion_ids[i:i + batch_size]))
+
+        self.stdout.write(f"✅ Refreshed metrics of {len(promotion_ids)} promotions")
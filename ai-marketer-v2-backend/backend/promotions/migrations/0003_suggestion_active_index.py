@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0008_business_trend_settings'),
+        ('promotions', '0002_promotion_generation_job'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promotionsuggestion',
+            index=models.Index(fields=['business', 'is_dismissed', '-created_at'], name='promo_suggestion_active_idx'),
+        ),
+    ]
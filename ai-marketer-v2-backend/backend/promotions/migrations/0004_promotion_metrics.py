@@ -0,0 +1,34 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('promotions', '0003_suggestion_active_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PromotionMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sold_count', models.IntegerField(blank=True, null=True)),
+                ('sales_change', models.FloatField(blank=True, null=True)),
+                ('baseline_units', models.FloatField(blank=True, null=True)),
+                ('lift_percent', models.FloatField(blank=True, null=True)),
+                ('revenue', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('baseline_revenue', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('revenue_lift', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('confidence', models.FloatField(blank=True, null=True)),
+                ('product_breakdown', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('promotion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='promotions.promotion')),
+            ],
+            options={
+                'verbose_name_plural': 'Promotion Metrics',
+            },
+        ),
+    ]
@@ -2,6 +2,7 @@
 from django.db import models
 
 from businesses.models import Business
+from config.constants import PROMOTION_GENERATION_STATUS_OPTIONS
 
 class PromotionCategories(models.Model):
     key = models.CharField(max_length=50, unique=True)
@@ -34,6 +35,30 @@ class Promotion(models.Model):
         ordering = ["-created_at"]
 
 
+class PromotionMetrics(models.Model):
+    """
+    Sales effect of a promotion against the look-back periods before it (see promotions.analytics).
+    Refreshed after new sales data is ingested, which includes the nightly performance refresh.
+    """
+    promotion = models.OneToOneField(Promotion, on_delete=models.CASCADE, related_name="metrics")
+    sold_count = models.IntegerField(null=True, blank=True)  # Units sold during the promotion so far
+    sales_change = models.FloatField(null=True, blank=True)  # Units sold above the baseline
+    baseline_units = models.FloatField(null=True, blank=True)  # Average units of the look-back periods
+    lift_percent = models.FloatField(null=True, blank=True)  # Units above the baseline, in percent of it
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    baseline_revenue = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    revenue_lift = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    confidence = models.FloatField(null=True, blank=True)  # 0-1, how unlikely the change is from usual variation
+    product_breakdown = models.JSONField(default=list, blank=True)  # Units, baseline and revenue per target product
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Promotion Metrics - {self.promotion_id}"
+
+    class Meta:
+        verbose_name_plural = "Promotion Metrics"
+
+
 class PromotionSuggestion(models.Model):
     business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="suggestions")
     categories = models.ManyToManyField(PromotionCategories, related_name="suggestions")
@@ -51,4 +76,22 @@ class PromotionSuggestion(models.Model):
          return f"Promotion Suggestion - {self.business.name}"
     class Meta:
         ordering = ["-created_at"]
-        verbose_name_plural = "Promotion Suggestions"
\ No newline at end of file
+        verbose_name_plural = "Promotion Suggestions"
+        indexes = [
+            models.Index(fields=["business", "is_dismissed", "-created_at"], name="promo_suggestion_active_idx"),
+        ]
+
+class PromotionGenerationJob(models.Model):
+    """Background generation of promotion suggestions, polled by the client until it finishes."""
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="promotion_generation_jobs")
+    status = models.CharField(max_length=10, choices=PROMOTION_GENERATION_STATUS_OPTIONS, default='queued')
+    error = models.TextField(null=True, blank=True)
+    suggestion_ids = models.JSONField(default=list, blank=True)  # Suggestions created by the job
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Promotion Generation ({self.status}) - {self.business.name}"
+
+    class Meta:
+        ordering = ["-created_at"]
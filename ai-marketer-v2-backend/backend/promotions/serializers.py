@@ -1,18 +1,32 @@
 # promotions/serializers.py
-from datetime import timedelta
 import logging
 
-from django.db.models import Sum
-from django.utils import timezone
+from django.db.models import Manager
 from rest_framework import serializers
 
 from posts.serializers import PostSerializer
-from sales.models import SalesDataPoint
 
-from .models import Promotion, PromotionSuggestion, PromotionCategories
+from .analytics import (
+    METRICS_FIELDS,
+    compute_promotion_metrics,
+    get_promotion_products,
+    get_promotion_status,
+    refresh_promotion_metrics,
+)
+from .models import Promotion, PromotionCategories, PromotionGenerationJob, PromotionSuggestion
 
 logger = logging.getLogger(__name__)
 
+class PromotionListSerializer(serializers.ListSerializer):
+    """Computes the metrics of every promotion in the list without stored metrics at once, before they are serialized."""
+
+    def to_representation(self, data):
+        promotions = list(data.all() if isinstance(data, Manager) else data)
+        self.context['promotion_metrics'] = compute_promotion_metrics(
+            [promotion for promotion in promotions if not hasattr(promotion, 'metrics')]
+        )
+        return super().to_representation(promotions)
+
 class PromotionSerializer(serializers.ModelSerializer):
     posts = serializers.SerializerMethodField()
     status = serializers.SerializerMethodField()
@@ -28,9 +42,11 @@ class PromotionSerializer(serializers.ModelSerializer):
     products = serializers.SerializerMethodField()
     sold_count = serializers.SerializerMethodField()
     sales_change = serializers.SerializerMethodField()
+    metrics = serializers.SerializerMethodField()
 
     class Meta:
         model = Promotion
+        list_serializer_class = PromotionListSerializer
         fields = [
             "id",
             "posts",
@@ -42,6 +58,7 @@ class PromotionSerializer(serializers.ModelSerializer):
             "status",
             "sold_count",
             "sales_change",
+            "metrics",
             "product_names",
             "products",
         ]
@@ -57,125 +74,45 @@ class PromotionSerializer(serializers.ModelSerializer):
         return PostSerializer(posts, many=True, context=self.context).data
 
     def get_products(self, obj):
-        # Return products with categories if product_data is available
-        if hasattr(obj, 'product_data') and obj.product_data:
-            return obj.product_data
-        
-        # Otherwise, convert from product_names (backward compatibility)
-        elif obj.product_names:
-            return [{'name': name, 'category': 'average'} for name in obj.product_names]
-        
-        return []
+        return get_promotion_products(obj)
     
     # Calculate status dynamically based on current time vs. promotion dates
     def get_status(self, obj):
-        now = timezone.now().date()
-        if not obj.start_date and not obj.end_date:
-            return "ongoing"
-        
-        if obj.start_date and not obj.end_date:
-            return "ongoing" if now >= obj.start_date else "upcoming"
-        
-        if obj.start_date and obj.end_date:
-            if now < obj.start_date:
-                return "upcoming"
-            elif obj.start_date <= now <= obj.end_date:
-                return "ongoing"
-            else:
-                return "ended"
-        
-        return "unknown"
+        return get_promotion_status(obj)
+
+    def create(self, validated_data):
+        promotion = super().create(validated_data)
+        self._store_metrics(promotion)
+        return promotion
+
+    def update(self, instance, validated_data):
+        promotion = super().update(instance, validated_data)
+        self._store_metrics(promotion)
+        return promotion
+
+    def _store_metrics(self, promotion):
+        # Dates or products may have changed, so the metrics are recomputed before responding
+        promotion.metrics = refresh_promotion_metrics([promotion])[0]
+
+    def _get_metrics(self, obj):
+        # Stored metrics, or computed for the whole list by PromotionListSerializer, or here for a single promotion
+        if hasattr(obj, 'metrics'):
+            return {field: getattr(obj.metrics, field) for field in METRICS_FIELDS}
+
+        promotion_metrics = self.context.setdefault('promotion_metrics', {})
+        if obj.id not in promotion_metrics:
+            promotion_metrics.update(compute_promotion_metrics([obj]))
+        return promotion_metrics[obj.id]
+
+    def get_metrics(self, obj):
+        computed_at = obj.metrics.computed_at if hasattr(obj, 'metrics') else None
+        return {**self._get_metrics(obj), "computed_at": computed_at}
     
     def get_sold_count(self, obj): 
-        if self.get_status(obj) == "upcoming":
-            return 0
-        
-        today = timezone.now().date()
-        start_date = obj.start_date
-
-        if obj.end_date and obj.end_date < today:
-            end_date = obj.end_date
-        else:
-            end_date = today
-        
-        promotion_days = (end_date - start_date).days + 1
-
-        if promotion_days < 1:
-            return 0
-        
-        products = self.get_products(obj)
-        if not products:
-            return None
-        product_names = [product['name'] for product in products]
-
-        promotion_sales = SalesDataPoint.objects.filter(
-            business=obj.business,
-            product_name__in=product_names,
-            date__gte=start_date,
-            date__lte=end_date
-        ).aggregate(total=Sum('units_sold'))['total'] or 0
-
-        return promotion_sales
+        return self._get_metrics(obj)['sold_count']
 
     def get_sales_change(self, obj):
-        if self.get_status(obj) == "upcoming":
-            return None
-        
-        today = timezone.now().date()
-        start_date = obj.start_date
-
-        if obj.end_date and obj.end_date < today:
-            end_date = obj.end_date
-        else:
-            end_date = today
-        
-        promotion_days = (end_date - start_date).days + 1
-
-        if promotion_days < 1:
-            return None
-        
-        products = self.get_products(obj)
-        if not products:
-            return None
-        product_names = [product['name'] for product in products]
-
-        promotion_sales = self.get_sold_count(obj)
-
-        days_to_look_back = 30
-        before_start_date = start_date - timedelta(days=days_to_look_back)
-        before_end_date = start_date - timedelta(days=1)
-
-        total_back_days = (before_end_date - before_start_date).days + 1
-        num_periods = total_back_days // promotion_days
-        num_periods = max(1, num_periods)
-
-        period_sales_list = []
-
-        for i in range(num_periods):
-            period_end = before_end_date - timedelta(days=i * promotion_days)
-            period_start = max(before_start_date, period_end - timedelta(days=promotion_days - 1))
-            
-            if period_start > period_end:
-                continue
-
-            period_sales = SalesDataPoint.objects.filter(
-                business=obj.business,
-                product_name__in=product_names,
-                date__gte=period_start,
-                date__lte=period_end
-            ).aggregate(total=Sum('units_sold'))['total'] or 0
-            
-            period_sales_list.append(period_sales)
-        
-        if not period_sales_list:
-            return 0
-            
-        avg_period_sales = sum(period_sales_list) / len(period_sales_list)
-
-        if avg_period_sales == 0:
-            return promotion_sales
-        
-        return round(promotion_sales - avg_period_sales, 1)
+        return self._get_metrics(obj)['sales_change']
     
 class SuggestionSerializer(serializers.ModelSerializer):
     categories = serializers.SerializerMethodField()
@@ -222,4 +159,15 @@ class SuggestionSerializer(serializers.ModelSerializer):
             "start_date": obj.data_start_date.isoformat(),
             "end_date": obj.data_end_date.isoformat()
         }
-    
\ No newline at end of file
+
+class PromotionGenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PromotionGenerationJob
+        fields = [
+            "id",
+            "status",
+            "error",
+            "suggestion_ids",
+            "created_at",
+            "completed_at",
+        ]
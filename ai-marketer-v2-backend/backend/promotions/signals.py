@@ -3,9 +3,15 @@ from django.dispatch import receiver
 
 from config.constants import PROMOTION_CATEGORIES_OPTIONS
 from promotions.models import PromotionCategories
+from promotions.tasks import refresh_promotion_metrics_task
+from sales.signals import sales_data_updated
 
 @receiver(post_migrate)
 def populate_promotion_categories(sender, **kwargs):
     if sender.name == "promotions":
         for option in PROMOTION_CATEGORIES_OPTIONS:
-            PromotionCategories.objects.get_or_create(key=option["key"], label=option["label"])
\ No newline at end of file
+            PromotionCategories.objects.get_or_create(key=option["key"], label=option["label"])
+
+@receiver(sales_data_updated)
+def schedule_promotion_metrics_refresh(sender, business_id, **kwargs):
+    refresh_promotion_metrics_task.delay(business_id)
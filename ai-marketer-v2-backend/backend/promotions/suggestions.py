@@ -0,0 +1,140 @@
+# promotions/suggestions.py
+from datetime import datetime, timedelta
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+from pytz import timezone
+
+from sales.performance import get_products_performance
+from sales.products import ProductIndex
+from utils.openai_api import generate_promotions
+
+from .models import PromotionCategories, PromotionSuggestion
+
+logger = logging.getLogger(__name__)
+
+def generate_promotion_suggestions(business):
+    """
+    Generate promotion suggestions for a business from its product performance.
+
+    Returns:
+        List of the created PromotionSuggestion instances
+    """
+    # Auto-archive old suggestions to ensure there's room for new ones
+    auto_archive_suggestions(business)
+
+    # Fetching performance and pricing data
+    products_performance = get_products_performance(business)
+    context_data = {
+        "name": business.name,
+        "type": business.category,
+        "target_customers": business.target_customers,
+        "vibe": business.vibe
+    }
+    feedback_context = get_feedback_context(business)
+
+    ai_input_payload= {
+        "products_performance": products_performance,
+        "context_data": context_data,
+        "feedback_history": feedback_context
+    }
+
+    # Generate promotions
+    suggestions_data = generate_promotions(ai_input_payload)
+
+    # Match product names returned by the AI to the analysed products in O(1)
+    products_index = ProductIndex(
+        (p['product_name'], p) for p in products_performance['products']
+    )
+
+    suggestion_instances = []
+    for suggestion in suggestions_data:
+        product_names = suggestion.get('product_name', [])
+        products_with_categories = []
+        for product_name in product_names:
+            product_info = products_index.get(product_name)
+            if product_info:
+                products_with_categories.append({
+                    'name': product_name,
+                    'category': product_info['category']
+                })
+            else:
+                products_with_categories.append({
+                    'name': product_name,
+                    'category': 'average'
+                })
+
+        suggestion_instance = PromotionSuggestion(
+            business=business,
+            title=suggestion.get('title'),
+            description=suggestion.get('description'),
+            product_names=product_names,
+            product_data=products_with_categories,
+            data_start_date=products_performance.get('start_date'),
+            data_end_date=products_performance.get('end_date'),
+        )
+        suggestion_instances.append(suggestion_instance)
+
+    # Resolve category keys in memory, from a single query
+    category_ids = dict(PromotionCategories.objects.values_list('key', 'id'))
+    SuggestionCategory = PromotionSuggestion.categories.through
+
+    with transaction.atomic():
+        # Bulk create the valid suggestions
+        created_suggestions = PromotionSuggestion.objects.bulk_create(suggestion_instances)
+
+        # Associate the categories of every suggestion in one insert
+        category_links = []
+        for suggestion, suggestion_instance in zip(suggestions_data, created_suggestions):
+            suggestion_category_ids = {category_ids[key] for key in suggestion['category'] if key in category_ids}
+
+            if not suggestion_category_ids:
+                logger.error(f"Category '{suggestion['category']}' not found in the database.")
+
+            category_links.extend(
+                SuggestionCategory(promotionsuggestion_id=suggestion_instance.id, promotioncategories_id=category_id)
+                for category_id in suggestion_category_ids
+            )
+
+        SuggestionCategory.objects.bulk_create(category_links)
+
+    return created_suggestions
+
+def auto_archive_suggestions(business, days=30, max_active_count = 5):
+    """
+    Archive active suggestions older than `days`, and the oldest of the rest beyond `max_active_count`,
+    in a single UPDATE.
+    """
+    start_date = datetime.now(timezone('UTC')) - timedelta(days)
+    active_suggestions = PromotionSuggestion.objects.filter(business=business, is_dismissed=False)
+
+    # Recent suggestions past the newest max_active_count
+    extra_suggestions = active_suggestions.filter(created_at__gte=start_date).annotate(
+        position=Window(RowNumber(), order_by=[F('created_at').desc(), F('id').desc()])
+    ).filter(position__gt=max_active_count).values('id')
+
+    active_suggestions.filter(
+        Q(created_at__lt=start_date) | Q(id__in=extra_suggestions)
+    ).update(
+        is_dismissed=True,
+        feedback=Case(
+            When(created_at__lt=start_date, then=Value("Auto-archived due to age")),
+            default=Value("Auto-archived to make room for new suggestions")
+        )
+    )
+
+def get_feedback_context(business):
+    recent_dismissed = PromotionSuggestion.objects.filter(business=business, is_dismissed=True).exclude(feedback=None).exclude(feedback='').exclude(feedback__startswith="Auto-archived").order_by('-created_at')[:5]
+
+    feedback_context = []
+    if recent_dismissed.exists():
+        for dismissed in recent_dismissed:
+            if dismissed.product_names and dismissed.feedback:
+                feedback_context.append({
+                    'product_names': dismissed.product_names,
+                    'feedback': dismissed.feedback
+                })
+
+    return feedback_context
@@ -0,0 +1,106 @@
+# promotions/tasks.py
+import logging
+
+from celery import shared_task
+from django.utils import timezone
+
+from utils.locks import acquire_cache_lock, release_cache_lock
+
+from .analytics import refresh_promotion_metrics
+from .models import Promotion, PromotionGenerationJob
+from .suggestions import generate_promotion_suggestions
+
+logger = logging.getLogger(__name__)
+
+# Longest a generation may hold the business lock before another one can start
+PROMOTION_GENERATION_LOCK_TIMEOUT = 60 * 5
+
+def promotion_generation_lock_key(business_id):
+    return f"promotions:generation:lock:{business_id}"
+
+class PromotionGenerationBusy(Exception):
+    """The generation lock of a business is held, but its job isn't visible yet."""
+
+def _active_generation_job(business):
+    return PromotionGenerationJob.objects.filter(
+        business=business,
+        status__in=['queued', 'running']
+    ).order_by('-created_at').first()
+
+def start_promotion_generation(business):
+    """
+    Queue a suggestion generation job for a business.
+    While a job is queued or running, that job is returned instead of starting another one,
+    so repeated requests don't pay for the model call twice. A job is only created by the
+    request holding the business lock, and the lock is released by the job's task.
+
+    Returns:
+        Tuple of (job, created)
+
+    Raises:
+        PromotionGenerationBusy: The lock is held without an active job (e.g. a job being created)
+    """
+    lock_key = promotion_generation_lock_key(business.id)
+    lock_token = acquire_cache_lock(lock_key, PROMOTION_GENERATION_LOCK_TIMEOUT)
+
+    if not lock_token:
+        job = _active_generation_job(business)
+        if job:
+            return job, False
+        raise PromotionGenerationBusy(f"Promotion generation is already starting for business {business.id}")
+
+    # A job can outlive the lock while it waits behind other tasks
+    job = _active_generation_job(business)
+    if job:
+        release_cache_lock(lock_key, lock_token)
+        return job, False
+
+    job = PromotionGenerationJob.objects.create(business=business)
+    try:
+        generate_promotion_suggestions_task.delay(job.id, lock_token)
+    except Exception as e:
+        PromotionGenerationJob.objects.filter(id=job.id).update(
+            status='failed',
+            error=str(e),
+            completed_at=timezone.now()
+        )
+        release_cache_lock(lock_key, lock_token)
+        raise
+
+    return job, True
+
+@shared_task
+def generate_promotion_suggestions_task(job_id, lock_token):
+    """Run a queued suggestion generation job and record its outcome, then release the lock it was queued with."""
+    job = PromotionGenerationJob.objects.select_related('business').filter(id=job_id).first()
+    if not job:
+        return
+
+    try:
+        PromotionGenerationJob.objects.filter(id=job_id).update(status='running')
+
+        try:
+            suggestions = generate_promotion_suggestions(job.business)
+        except Exception as e:
+            logger.error(f"❌ Promotion suggestion generation failed for business {job.business_id}: {e}", exc_info=True)
+            PromotionGenerationJob.objects.filter(id=job_id).update(
+                status='failed',
+                error=str(e),
+                completed_at=timezone.now()
+            )
+            return
+
+        PromotionGenerationJob.objects.filter(id=job_id).update(
+            status='completed',
+            suggestion_ids=[suggestion.id for suggestion in suggestions],
+            completed_at=timezone.now()
+        )
+        logger.info(f"✅ Generated {len(suggestions)} promotion suggestions for business {job.business_id}")
+    finally:
+        release_cache_lock(promotion_generation_lock_key(job.business_id), lock_token)
+
+@shared_task
+def refresh_promotion_metrics_task(business_id):
+    """Recompute the metrics of every promotion of a business."""
+    metrics = refresh_promotion_metrics(Promotion.objects.filter(business_id=business_id))
+    logger.info(f"✅ Refreshed metrics of {len(metrics)} promotions for business {business_id}")
@@ -1,3 +1,195 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from businesses.models import Business
+from posts.models import Category, Post
+from sales.models import SalesDataPoint
+from social.models import SocialMedia
+from users.models import User
+from utils.locks import acquire_cache_lock
+
+from .models import Promotion, PromotionCategories, PromotionGenerationJob, PromotionMetrics
+from .tasks import generate_promotion_suggestions_task, promotion_generation_lock_key, start_promotion_generation
+
+class PromotionListQueriesTest(TestCase):
+    """The promotion list costs the same number of queries however many promotions it returns."""
+
+    # Business, promotions with their metrics, posts with their platform, post categories, promotion categories
+    LIST_QUERIES = 5
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="owner@example.com", name="Owner", password="password")
+        self.business = Business.objects.create(name="Test Cafe", owner=self.user)
+        self.platform = SocialMedia.objects.create(
+            business=self.business, platform="instagram", link="https://instagram.com/testcafe", username="testcafe"
+        )
+        self.post_categories = [
+            Category.objects.get_or_create(key=key, defaults={'label': key})[0]
+            for key in ['brand_story', 'deal_discount']
+        ]
+        self.promotion_categories = [
+            PromotionCategories.objects.get_or_create(key=key, defaults={'label': key})[0]
+            for key in ['bundle', 'flash_sale']
+        ]
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_promotions(self, count):
+        for i in range(count):
+            promotion = Promotion.objects.create(
+                business=self.business,
+                description=f"Promotion {i}",
+                start_date=date.today() - timedelta(days=7),
+                end_date=date.today() + timedelta(days=7),
+                product_data=[{'name': 'Latte', 'category': 'top_10_percent'}],
+            )
+            promotion.categories.set(self.promotion_categories)
+            PromotionMetrics.objects.create(promotion=promotion, sold_count=i, sales_change=1.0)
+
+            for _ in range(2):
+                post = Post.objects.create(
+                    business=self.business, platform=self.platform, promotion=promotion, caption="Come try it"
+                )
+                post.categories.set(self.post_categories)
+
+    def test_list_queries_do_not_grow_with_promotions(self):
+        for count in [2, 5]:
+            with self.subTest(promotions=count):
+                self.create_promotions(count)
+                total = Promotion.objects.filter(business=self.business).count()
+
+                with self.assertNumQueries(self.LIST_QUERIES):
+                    response = self.client.get('/api/promotions/')
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data), total)
+                self.assertTrue(all(len(promotion['posts']) == 2 for promotion in response.data))
+
+    def test_missing_metrics_are_computed_in_one_query(self):
+        for count in [2, 5]:
+            with self.subTest(promotions=count):
+                self.create_promotions(count)
+                PromotionMetrics.objects.all().delete()
+                total = Promotion.objects.filter(business=self.business).count()
+
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get('/api/promotions/')
+
+                sales_queries = [
+                    query for query in queries.captured_queries
+                    if SalesDataPoint._meta.db_table in query['sql']
+                ]
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data), total)
+                self.assertEqual(len(sales_queries), 1)
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PromotionGenerationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="owner@example.com", name="Owner", password="password")
+        self.business = Business.objects.create(name="Test Cafe", owner=self.user)
+        self.lock_key = promotion_generation_lock_key(self.business.id)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    @mock.patch('promotions.tasks.generate_promotion_suggestions_task.delay')
+    def test_returns_the_active_job(self, delay):
+        first = self.client.post('/api/promotions/generate/')
+        second = self.client.post('/api/promotions/generate/')
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.data['id'], first.data['id'])
+        delay.assert_called_once()
+
+    @mock.patch('promotions.tasks.generate_promotion_suggestions_task.delay')
+    def test_queued_job_outlives_its_lock(self, delay):
+        job, created = start_promotion_generation(self.business)
+        cache.delete(self.lock_key)
+
+        self.assertEqual(start_promotion_generation(self.business), (job, False))
+        delay.assert_called_once()
+        self.assertIsNone(cache.get(self.lock_key))
+
+    def test_lock_held_without_a_job(self):
+        acquire_cache_lock(self.lock_key, 60)
+
+        response = self.client.post('/api/promotions/generate/')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(PromotionGenerationJob.objects.exists())
+
+    @mock.patch('promotions.tasks.generate_promotion_suggestions_task.delay', side_effect=ConnectionError("broker down"))
+    def test_failed_enqueue_releases_the_lock(self, delay):
+        with self.assertRaises(ConnectionError):
+            start_promotion_generation(self.business)
+
+        job = PromotionGenerationJob.objects.get()
+        self.assertEqual(job.status, 'failed')
+        self.assertIsNone(cache.get(self.lock_key))
+
+    @mock.patch('promotions.tasks.generate_promotion_suggestions', return_value=[])
+    @mock.patch('promotions.tasks.generate_promotion_suggestions_task.delay')
+    def test_task_only_releases_its_own_lock(self, delay, generate):
+        job, _ = start_promotion_generation(self.business)
+        (_, lock_token), _ = delay.call_args
+
+        generate_promotion_suggestions_task(job.id, lock_token)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertIsNone(cache.get(self.lock_key))
+
+        other_token = acquire_cache_lock(self.lock_key, 60)
+        generate_promotion_suggestions_task(job.id, lock_token)
+
+        self.assertEqual(cache.get(self.lock_key), other_token)
+
+class RefreshPromotionMetricsCommandTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email="owner@example.com", name="Owner", password="password")
+        self.business = Business.objects.create(name="Test Cafe", owner=self.user)
+        self.promotion = Promotion.objects.create(
+            business=self.business,
+            description="Latte week",
+            start_date=date.today() - timedelta(days=6),
+            end_date=date.today(),
+            product_data=[{'name': 'Latte', 'category': 'top_10_percent'}],
+        )
+        for days_ago, units in [(0, 3), (7, 1), (8, 1)]:
+            SalesDataPoint.objects.create(
+                business=self.business, date=date.today() - timedelta(days=days_ago), product_name="Latte",
+                product_price=Decimal('4.35'), units_sold=units, revenue=Decimal('4.35') * units, source='upload'
+            )
+
+    def test_stores_missing_metrics(self):
+        call_command('refresh_promotion_metrics', stdout=StringIO())
+
+        metrics = PromotionMetrics.objects.get(promotion=self.promotion)
+        self.assertEqual(metrics.sold_count, 3)
+        self.assertEqual(metrics.revenue, Decimal('13.05'))
+        # Look-back weeks of 8.70, 0, 0 and 0
+        self.assertEqual(metrics.baseline_revenue, Decimal('2.18'))
+        self.assertEqual(metrics.revenue_lift, Decimal('10.88'))
+
+    def test_keeps_stored_metrics(self):
+        PromotionMetrics.objects.create(promotion=self.promotion, sold_count=1)
+
+        call_command('refresh_promotion_metrics', stdout=StringIO())
+        self.assertEqual(PromotionMetrics.objects.get(promotion=self.promotion).sold_count, 1)
+
+        call_command('refresh_promotion_metrics', '--all', stdout=StringIO())
+        self.assertEqual(PromotionMetrics.objects.get(promotion=self.promotion).sold_count, 3)
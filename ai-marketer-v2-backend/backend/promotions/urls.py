@@ -18,7 +18,8 @@ router.register(r'', PromotionViewSet, basename='promotion')
 # - GET /{id}/      -> retrieve promotion
 # - PUT /{id}/      -> update promotion
 # - DELETE /{id}/   -> delete promotion
-# - GENERATE        -> generate promotion suggestions
+# - POST /generate/ -> queue promotion suggestion generation
+# - GET /generate/{job_id}/ -> status of a generation job
 urlpatterns = [
     path('', include(router.urls)),
 ]
@@ -0,0 +1,96 @@
+# backend/sales/analytics.py
+from django.db.models import F
+from django.db.models.functions import TruncMonth, TruncWeek
+import pandas as pd
+
+# Colors for the product charts
+CHART_COLORS = ['#FF6384', '#36A2EB', '#FFCE56']
+
+GRANULARITY_CHOICES = ('day', 'week', 'month')
+
+# Ranges longer than these (in days) are bucketed more coarsely when no
+# granularity is requested, so a chart never carries more than ~100 points
+AUTO_GRANULARITY_MAX_DAYS = {
+    'day': 92,
+    'week': 730,
+}
+
+# pandas frequency matching the bucket start returned by the database
+# (TruncWeek truncates to Monday, TruncMonth to the first of the month)
+PERIOD_FREQUENCIES = {
+    'day': 'D',
+    'week': 'W-MON',
+    'month': 'MS',
+}
+
+LABEL_DATE_FORMATS = {
+    'day': '%d-%m-%Y',
+    'week': '%d-%m-%Y',
+    'month': '%m-%Y',
+}
+
+def resolve_granularity(granularity, start_date, end_date):
+    """Pick the bucket size for a range, choosing automatically when none is requested."""
+    if granularity:
+        return granularity
+
+    range_days = (end_date - start_date).days + 1
+    for candidate, max_days in AUTO_GRANULARITY_MAX_DAYS.items():
+        if range_days <= max_days:
+            return candidate
+    return 'month'
+
+def period_expression(granularity):
+    """Database expression truncating SalesDataPoint.date to the start of its bucket."""
+    if granularity == 'week':
+        return TruncWeek('date')
+    if granularity == 'month':
+        return TruncMonth('date')
+    return F('date')
+
+def dense_period_index(first_period, last_period, granularity='day'):
+    """Index covering every bucket between the first and last one, gaps included."""
+    return pd.date_range(first_period, last_period, freq=PERIOD_FREQUENCIES[granularity])
+
+def format_labels(period_index, granularity='day'):
+    """Format a period index as chart.js labels."""
+    return period_index.strftime(LABEL_DATE_FORMATS[granularity]).tolist()
+
+def pivot_period_values(records, period_index, value_key, column_key=None, columns=None):
+    """
+    Pivot per-period aggregates onto a dense period index.
+
+    Args:
+        records: Iterable of dicts with a 'period' key, the value key and optionally the column key
+        period_index: Dense index the result is aligned to (missing periods become 0)
+        value_key: Name of the numeric field to plot
+        column_key: Field to spread into columns (e.g. 'product_name'), or None for a single series
+        columns: Column order of the result; columns without data are filled with 0
+
+    Returns:
+        DataFrame indexed by period_index with one float column per series
+    """
+    fields = ['period', value_key] + ([column_key] if column_key else [])
+    df = pd.DataFrame.from_records(list(records), columns=fields)
+    df['period'] = pd.to_datetime(df['period'])
+    df[value_key] = df[value_key].astype(float)
+
+    if column_key:
+        pivot = df.pivot_table(index='period', columns=column_key, values=value_key, aggfunc='sum')
+    else:
+        pivot = df.groupby('period')[[value_key]].sum()
+
+    return pivot.reindex(index=period_index, columns=columns).fillna(0.0)
+
+def build_line_datasets(pivot, colors=CHART_COLORS):
+    """Convert each column of a pivoted frame into a chart.js line dataset."""
+    return [
+        {
+            "label": column,
+            "data": pivot[column].round(2).tolist(),
+            "fill": False,
+            "borderColor": colors[i % len(colors)],
+            "tension": 0.1
+        }
+        for i, column in enumerate(pivot.columns)
+    ]
@@ -0,0 +1,52 @@
+# backend/sales/cache.py
+import logging
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Chart payloads only change when new sales data is ingested, so they can live
+# for a long time. Ingestion bumps the business version instead of deleting keys.
+SALES_CHART_CACHE_TIMEOUT = 60 * 60 * 24
+
+def _version_key(business_id):
+    return f"sales:version:{business_id}"
+
+def get_sales_cache_version(business_id):
+    """Return the current sales data version for a business."""
+    try:
+        version = cache.get(_version_key(business_id))
+        if version is None:
+            cache.add(_version_key(business_id), 1, timeout=None)
+            version = cache.get(_version_key(business_id), 1)
+        return version
+    except Exception as e:
+        logger.warning(f"Sales cache unavailable: {e}")
+        return None
+
+def bump_sales_cache_version(business_id):
+    """Invalidate every cached sales payload of a business."""
+    try:
+        cache.incr(_version_key(business_id))
+    except ValueError:
+        # Key doesn't exist yet, so nothing was cached against it
+        cache.add(_version_key(business_id), 1, timeout=None)
+    except Exception as e:
+        logger.warning(f"Failed to bump sales cache version for business {business_id}: {e}")
+
+def sales_chart_cache_key(business_id, version, *parts):
+    suffix = ":".join(str(part) for part in parts)
+    return f"sales:chart:{business_id}:v{version}:{suffix}"
+
+def get_cached_sales_chart(key):
+    try:
+        return cache.get(key)
+    except Exception as e:
+        logger.warning(f"Sales cache read failed: {e}")
+        return None
+
+def set_cached_sales_chart(key, payload):
+    try:
+        cache.set(key, payload, timeout=SALES_CHART_CACHE_TIMEOUT)
+    except Exception as e:
+        logger.warning(f"Sales cache write failed: {e}")
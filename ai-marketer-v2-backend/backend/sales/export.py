@@ -0,0 +1,152 @@
+# backend/sales/export.py
+import csv
+import io
+from itertools import islice
+
+from .models import SalesDataPoint
+from .performance import get_products_performance
+
+# Rows fetched per server-side cursor round trip and written per CSV block / Parquet row group
+EXPORT_CHUNK_SIZE = 5000
+
+# Columns of each exportable dataset, paired with their Parquet type name
+RAW_COLUMNS = [
+    ('date', 'date'),
+    ('product_name', 'string'),
+    ('product_price', 'decimal'),
+    ('units_sold', 'int'),
+    ('revenue', 'decimal'),
+    ('source', 'string'),
+]
+
+PRODUCT_COLUMNS = [
+    ('product_name', 'string'),
+    ('total_revenue', 'float'),
+    ('total_units', 'int'),
+    ('category', 'string'),
+    ('trend', 'string'),
+    ('description_with_price', 'string'),
+]
+
+EXPORT_DATASETS = ('raw', 'products')
+EXPORT_FILE_TYPES = ('csv', 'parquet')
+
+def get_export_rows(business, dataset, start_date=None, end_date=None):
+    """
+    Return (columns, row iterator) for an export dataset.
+
+    Raw rows are read through a server-side cursor so memory stays flat no
+    matter how many data points the business has.
+    """
+    if dataset == 'products':
+        performance = get_products_performance(business)
+        columns = PRODUCT_COLUMNS
+        rows = (
+            tuple(product.get(name) for name, _ in columns)
+            for product in performance['products']
+        )
+        return columns, rows
+
+    queryset = SalesDataPoint.objects.filter(business=business)
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+
+    columns = RAW_COLUMNS
+    rows = queryset.order_by('date', 'product_name').values_list(
+        *[name for name, _ in columns]
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return columns, rows
+
+def _chunked(rows, size=EXPORT_CHUNK_SIZE):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def stream_csv(columns, rows):
+    """Yield the export as CSV text, one block per chunk of rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow([name for name, _ in columns])
+    for chunk in _chunked(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+class _ParquetStreamBuffer:
+    """Write-only file object that hands written bytes back to the response as they arrive."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+def stream_parquet(columns, rows):
+    """Yield the export as a Parquet file, writing one row group per chunk of rows."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        'date': pa.date32(),
+        'string': pa.string(),
+        'decimal': pa.decimal128(12, 2),
+        'int': pa.int64(),
+        'float': pa.float64(),
+    }
+    schema = pa.schema([(name, types[type_name]) for name, type_name in columns])
+
+    sink = _ParquetStreamBuffer()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for chunk in _chunked(rows):
+            values = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [
+                    pa.array(
+                        [float(v) if v is not None else None for v in column_values]
+                        if type_name == 'float' else column_values,
+                        type=schema.field(name).type
+                    )
+                    for (name, type_name), column_values in zip(columns, values)
+                ],
+                schema=schema
+            ))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def parquet_available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
@@ -0,0 +1,182 @@
+# backend/sales/management/commands/benchmark_sales_indexes.py
+from datetime import date, timedelta
+import json
+import secrets
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Avg, Sum
+
+from businesses.models import Business
+from sales.analytics import period_expression
+from sales.models import SalesDataPoint
+from sales.performance import PERFORMANCE_FIELDS
+from users.models import User
+
+# Owner of the seeded businesses, so they can be told apart from real ones and removed afterwards
+BENCHMARK_OWNER_EMAIL = "sales-index-benchmark@example.invalid"
+
+# Products a promotion or product chart typically reads
+BENCHMARK_PRODUCT_COUNT = 3
+
+# Indexes of SalesDataPoint the benchmarked queries are expected to be read from
+BUSINESS_DATE_INDEX = 'sales_point_business_date_idx'
+PRODUCT_DATE_INDEX = 'sales_point_product_date_idx'
+
+def _plan_nodes(node):
+    """Every node of an EXPLAIN (FORMAT JSON) plan tree."""
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
+
+def _describe_scan(node):
+    description = node['Node Type']
+    if node.get('Index Name'):
+        description += f" using {node['Index Name']}"
+    if 'Heap Fetches' in node:
+        description += f" (heap fetches: {node['Heap Fetches']})"
+    return description
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic sales data points and EXPLAIN the chart, product summary, performance and promotion "
+        "metrics queries, failing unless they are index-only scans on the sales data point indexes "
+        "(PostgreSQL only)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000_000)
+        parser.add_argument('--businesses', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=365, help="Days of history per business")
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded data for another run")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Index-only scans can only be checked on PostgreSQL.")
+
+        owner = User.objects.filter(email=BENCHMARK_OWNER_EMAIL).first()
+        if owner:
+            self.stdout.write("Reusing the data seeded by a previous run")
+        else:
+            owner = self._seed(options['rows'], options['businesses'], options['days'])
+
+        try:
+            business = Business.objects.filter(owner=owner).order_by('id').first()
+            self._explain_queries(business)
+        finally:
+            if not options['keep']:
+                self._cleanup(owner)
+
+    def _seed(self, rows, businesses, days):
+        owner = User.objects.create_user(
+            email=BENCHMARK_OWNER_EMAIL, name="Index Benchmark", password=secrets.token_urlsafe(32)
+        )
+        business_ids = [
+            business.id for business in Business.objects.bulk_create(
+                Business(name=f"Benchmark {i}", owner=owner) for i in range(businesses)
+            )
+        ]
+
+        # Every business gets one row per product and day, with as many products as the row count needs
+        rows_per_business = max(rows // businesses, 1)
+        self.stdout.write(f"Seeding {rows_per_business * businesses} rows for {businesses} businesses...")
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {SalesDataPoint._meta.db_table}
+                    (business_id, date, revenue, source, product_name, product_key, product_price, units_sold)
+                SELECT
+                    business.id,
+                    %(end_date)s::date - (point %% %(days)s)::int,
+                    round((random() * 100)::numeric, 2),
+                    'upload',
+                    'Product ' || (point / %(days)s),
+                    'product ' || (point / %(days)s),
+                    5.00,
+                    1 + floor(random() * 20)::int
+                FROM unnest(%(business_ids)s) AS business(id)
+                CROSS JOIN generate_series(0, %(rows_per_business)s - 1) AS point
+                """,
+                {
+                    'end_date': date.today(),
+                    'days': days,
+                    'business_ids': business_ids,
+                    'rows_per_business': rows_per_business,
+                }
+            )
+            # Index-only scans need the visibility map, which VACUUM sets
+            cursor.execute(f"VACUUM ANALYZE {SalesDataPoint._meta.db_table}")
+
+        return owner
+
+    def _explain_queries(self, business):
+        end_date = date.today()
+        chart_start = end_date - timedelta(days=90)
+        performance_start = end_date - timedelta(days=30)
+        product_names = [f"Product {i}" for i in range(BENCHMARK_PRODUCT_COUNT)]
+
+        # (name, queryset, index it must be read from with an index-only scan)
+        queries = [
+            # SalesDataView overall revenue chart
+            ('chart', SalesDataPoint.objects.filter(
+                business=business, date__gte=chart_start, date__lte=end_date
+            ).annotate(period=period_expression('day')).values('period').annotate(
+                total_revenue=Sum('revenue')
+            ).order_by('period'), BUSINESS_DATE_INDEX),
+            # SalesDataView top/bottom product charts
+            ('product chart', SalesDataPoint.objects.filter(
+                business=business, date__gte=chart_start, date__lte=end_date, product_name__in=product_names
+            ).annotate(period=period_expression('day')).values('period', 'product_name').annotate(
+                period_revenue=Sum('revenue')
+            ).order_by('period'), PRODUCT_DATE_INDEX),
+            # SalesDataView top/bottom product summary
+            ('product summary', SalesDataPoint.objects.filter(
+                business=business, date__gte=chart_start, date__lte=end_date, product_name__isnull=False
+            ).values('product_name').annotate(
+                total_revenue=Sum('revenue'),
+                total_units=Sum('units_sold'),
+                average_price=Avg('product_price')
+            ).order_by('-total_units'), BUSINESS_DATE_INDEX),
+            # sales.performance snapshot refresh
+            ('performance', SalesDataPoint.objects.filter(
+                business_id=business.id, date__range=[performance_start, end_date]
+            ).values_list(*PERFORMANCE_FIELDS), BUSINESS_DATE_INDEX),
+            # promotions.analytics metrics
+            ('promotion metrics', SalesDataPoint.objects.filter(
+                business_id__in=[business.id], product_name__in=product_names,
+                date__range=[performance_start, end_date]
+            ).values_list('business_id', 'product_name', 'date').annotate(
+                units=Sum('units_sold'), revenue=Sum('revenue')
+            ).order_by(), PRODUCT_DATE_INDEX),
+        ]
+
+        failures = []
+        for name, queryset, expected_index in queries:
+            plan = json.loads(queryset.explain(format='json', analyze=True))[0]
+            scans = [
+                node for node in _plan_nodes(plan['Plan'])
+                if node.get('Relation Name') == SalesDataPoint._meta.db_table
+            ]
+
+            passed = bool(scans) and all(
+                node['Node Type'] == 'Index Only Scan' and node.get('Index Name') == expected_index
+                for node in scans
+            )
+            if not passed:
+                failures.append(name)
+
+            style = self.style.SUCCESS if passed else self.style.ERROR
+            self.stdout.write(style(f"{name}: {', '.join(_describe_scan(node) for node in scans) or 'no scan found'}"))
+            self.stdout.write(f"    Execution Time: {plan['Execution Time']:.3f} ms")
+
+        if failures:
+            raise CommandError(
+                f"Not an Index Only Scan on the expected index: {', '.join(failures)}"
+            )
+
+    def _cleanup(self, owner):
+        self.stdout.write("Removing the seeded data...")
+        seeded = SalesDataPoint.objects.filter(business_id__in=Business.objects.filter(owner=owner).values('id'))
+        seeded._raw_delete(seeded.db)
+        owner.delete()
@@ -0,0 +1,48 @@
+# backend/sales/management/commands/benchmark_trends.py
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+import numpy as np
+import pandas as pd
+
+from sales.trends import calculate_trends
+
+class Command(BaseCommand):
+    help = "Time calculate_trends on synthetic sales data (no database access)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=500)
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--density', type=float, default=0.7, help="Share of product days with sales")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        products = options['products']
+        days = options['days']
+
+        end_date = date.today()
+        product_index, day_index = np.nonzero(rng.random((products, days)) < options['density'])
+        df = pd.DataFrame({
+            'product_key': [f"product {i}" for i in product_index],
+            'date': [end_date - timedelta(days=int(d)) for d in day_index],
+            'revenue': rng.gamma(2.0, 20.0, len(product_index)).round(2),
+        })
+
+        # Warm up once so imports and pandas caches don't count
+        calculate_trends(df, end_date)
+
+        timings = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            trends = calculate_trends(df, end_date)
+            timings.append(time.perf_counter() - start)
+
+        counts = trends['trend'].value_counts().to_dict()
+        self.stdout.write(
+            f"{products} products x {days} days ({len(df)} rows): "
+            f"median {np.median(timings) * 1000:.1f} ms, best {min(timings) * 1000:.1f} ms "
+            f"over {options['repeat']} runs — {counts}"
+        )
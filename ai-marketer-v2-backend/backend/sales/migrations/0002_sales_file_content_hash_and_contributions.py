@@ -0,0 +1,93 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:01
+
+import hashlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_content_hashes(apps, schema_editor):
+    """
+    Hash the stored files uploaded before duplicate detection, so re-uploading one is detected.
+    Files missing from storage are left without a hash. Of several identical files of a business
+    only the first gets the hash, as the hash is unique per business.
+    """
+    SalesData = apps.get_model('sales', 'SalesData')
+
+    seen = set()
+    for sales_file in SalesData.objects.filter(content_hash__isnull=True).exclude(file='').order_by('id').iterator():
+        digest = hashlib.sha256()
+        try:
+            with sales_file.file.open('rb') as stored_file:
+                for chunk in stored_file.chunks():
+                    digest.update(chunk)
+        except (FileNotFoundError, OSError):
+            continue
+
+        key = (sales_file.business_id, digest.hexdigest())
+        if key in seen:
+            continue
+        seen.add(key)
+
+        SalesData.objects.filter(id=sales_file.id).update(content_hash=key[1])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0002_initial'),
+        ('sales', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesDataContribution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units_sold', models.IntegerField()),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='salesdata',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AlterField(
+            model_name='salesdatapoint',
+            name='source_file',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='sales.salesdata'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdata',
+            constraint=models.UniqueConstraint(fields=('business', 'content_hash'), name='unique_sales_file_content'),
+        ),
+        migrations.AddField(
+            model_name='salesdatacontribution',
+            name='data_point',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='sales.salesdatapoint'),
+        ),
+        migrations.AddField(
+            model_name='salesdatacontribution',
+            name='sales_file',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contributions', to='sales.salesdata'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='salesdatacontribution',
+            unique_together={('sales_file', 'data_point')},
+        ),
+        # Attribute existing uploaded rows to the file that created them.
+        # Uploads didn't record their share before, so a row several files added to is credited
+        # in full to the first one: deleting that file removes the other files' units as well,
+        # and deleting the others leaves the row untouched.
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO sales_salesdatacontribution (sales_file_id, data_point_id, units_sold, revenue)
+                SELECT source_file_id, id, units_sold, revenue
+                FROM sales_salesdatapoint
+                WHERE source_file_id IS NOT NULL
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunPython(backfill_content_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0002_initial'),
+        ('sales', '0002_sales_file_content_hash_and_contributions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SquareSyncCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_id', models.CharField(max_length=64)),
+                ('window_start', models.DateTimeField()),
+                ('window_end', models.DateTimeField()),
+                ('cursor', models.TextField(blank=True, null=True)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='square_sync_cursors', to='businesses.business')),
+            ],
+            options={
+                'unique_together': {('business', 'location_id')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0004_square_merchant_id'),
+        ('sales', '0003_square_sync_cursor'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SquareOrderRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=64)),
+                ('version', models.IntegerField(default=0)),
+                ('line_totals', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='square_orders', to='businesses.business')),
+            ],
+            options={
+                'unique_together': {('business', 'order_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SquarePendingOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.CharField(max_length=64)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='square_pending_orders', to='businesses.business')),
+            ],
+            options={
+                'unique_together': {('business', 'order_id')},
+            },
+        ),
+    ]
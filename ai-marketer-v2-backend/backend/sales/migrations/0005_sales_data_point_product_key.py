@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:17
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copy of sales.products.normalize_product_name as of this migration, so later changes don't alter it
+VARIATION_SUFFIX_PATTERN = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]\s*$')
+SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+
+def normalize_product_name(name):
+    if not name:
+        return ''
+
+    key = unicodedata.normalize('NFKC', name).casefold()
+
+    while True:
+        stripped = VARIATION_SUFFIX_PATTERN.sub('', key)
+        if stripped == key or not stripped.strip():
+            break
+        key = stripped
+
+    return SEPARATOR_PATTERN.sub(' ', key).strip()
+
+
+def backfill_product_keys(apps, schema_editor):
+    """Set product_key on existing data points, one UPDATE per distinct product name."""
+    SalesDataPoint = apps.get_model('sales', 'SalesDataPoint')
+    product_names = SalesDataPoint.objects.exclude(product_name__isnull=True) \
+        .values_list('product_name', flat=True).distinct()
+    for product_name in product_names:
+        SalesDataPoint.objects.filter(product_name=product_name) \
+            .update(product_key=normalize_product_name(product_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_square_order_records'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesdatapoint',
+            name='product_key',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(backfill_product_keys, migrations.RunPython.noop),
+    ]
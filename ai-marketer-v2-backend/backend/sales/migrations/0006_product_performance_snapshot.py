@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0008_business_trend_settings'),
+        ('sales', '0005_sales_data_point_product_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPerformanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_key', models.CharField(max_length=255)),
+                ('product_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('rank', models.PositiveIntegerField()),
+                ('total_revenue', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('total_units', models.IntegerField()),
+                ('category', models.CharField(choices=[('top_10_percent', 'Top 10%'), ('average', 'Average'), ('bottom_10_percent', 'Bottom 10%')], max_length=20)),
+                ('trend', models.CharField(choices=[('upward', 'Upward'), ('flat', 'Flat'), ('downward', 'Downward')], max_length=10)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('computed_at', models.DateTimeField(auto_now_add=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_performance', to='businesses.business')),
+            ],
+            options={
+                'ordering': ['rank'],
+                'indexes': [models.Index(fields=['business', 'rank'], name='sales_perf_business_rank_idx')],
+                'unique_together': {('business', 'product_key')},
+            },
+        ),
+    ]
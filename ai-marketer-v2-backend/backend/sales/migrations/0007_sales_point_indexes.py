@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-19 13:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0008_business_trend_settings'),
+        ('sales', '0006_product_performance_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesdatapoint',
+            index=models.Index(fields=['business', 'date'], include=('revenue', 'units_sold', 'product_key', 'product_name', 'product_price'), name='sales_point_business_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesdatapoint',
+            index=models.Index(fields=['business', 'product_name', 'date'], include=('revenue', 'units_sold'), name='sales_point_product_date_idx'),
+        ),
+    ]
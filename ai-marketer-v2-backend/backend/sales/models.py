@@ -15,9 +15,13 @@ class SalesData(models.Model):
     uploaded_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False)
     processed_at = models.DateTimeField(blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True)  # SHA-256 of the file, used to skip re-uploads
     
     class Meta:
         ordering = ['-uploaded_at']
+        constraints = [
+            models.UniqueConstraint(fields=['business', 'content_hash'], name='unique_sales_file_content'),
+        ]
     
     def __str__(self):
         return f"{self.filename} - {self.business.name}"
@@ -30,15 +34,135 @@ class SalesDataPoint(models.Model):
     business = models.ForeignKey(Business, on_delete=models.CASCADE)
     date = models.DateField()
     revenue = models.DecimalField(max_digits=10, decimal_places=2)
-    source_file = models.ForeignKey(SalesData, on_delete=models.CASCADE, null=True, blank=True)
+    source_file = models.ForeignKey(SalesData, on_delete=models.SET_NULL, null=True, blank=True)  # First file that created the row
     source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='upload')
     product_name = models.CharField(max_length=255, null=True, blank=True)
+    product_key = models.CharField(max_length=255, blank=True, default='')  # Normalized product_name (see sales.products), used to match products across sources
     product_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     units_sold = models.IntegerField(default=1)
     
     class Meta:
         unique_together = ['business', 'date', 'source', 'product_name', 'product_price']
+        indexes = [
+            # Date range reads of a business (charts, product summary, performance), index-only on PostgreSQL
+            models.Index(
+                fields=['business', 'date'],
+                include=['revenue', 'units_sold', 'product_key', 'product_name', 'product_price'],
+                name='sales_point_business_date_idx'
+            ),
+            # Date range reads of specific products (product charts, promotion metrics)
+            models.Index(
+                fields=['business', 'product_name', 'date'],
+                include=['revenue', 'units_sold'],
+                name='sales_point_product_date_idx'
+            ),
+        ]
     
     def __str__(self):
         product_info = f" - {self.product_name}" if self.product_name else ""
-        return f"{self.business} - {self.date}{product_info} - {self.product_price} - {self.units_sold}"
\ No newline at end of file
+        return f"{self.business} - {self.date}{product_info} - {self.product_price} - {self.units_sold}"
+
+class SalesDataContribution(models.Model):
+    """
+    Units and revenue a single uploaded file added to a data point.
+    Data points are shared by every file covering the same day/product/price,
+    so this is what allows one file to be removed without touching the others.
+    """
+    sales_file = models.ForeignKey(SalesData, on_delete=models.CASCADE, related_name="contributions")
+    data_point = models.ForeignKey(SalesDataPoint, on_delete=models.CASCADE, related_name="contributions")
+    units_sold = models.IntegerField()
+    revenue = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        unique_together = ['sales_file', 'data_point']
+
+    def __str__(self):
+        return f"{self.sales_file.filename} -> {self.data_point_id} ({self.units_sold})"
+
+class SquareSyncCursor(models.Model):
+    """
+    Progress of an in-flight Square order sync for one location.
+    Rows live only while a sync is running, so a failed sync resumes from the last committed page.
+    """
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="square_sync_cursors")
+    location_id = models.CharField(max_length=64)
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    cursor = models.TextField(blank=True, null=True)  # Cursor of the next page to fetch
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['business', 'location_id']
+
+    def __str__(self):
+        state = "done" if self.completed else "pending"
+        return f"{self.business} - {self.location_id} ({state})"
+
+class SquareOrderRecord(models.Model):
+    """
+    Line totals a Square order last added to the data points.
+    Orders can reach us more than once (polling, webhooks, edits), so each one
+    is applied as the difference from what it contributed before.
+    """
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="square_orders")
+    order_id = models.CharField(max_length=64)
+    version = models.IntegerField(default=0)  # Square order version the totals were taken from
+    line_totals = models.JSONField(default=list)  # [[date, product_name, product_price, units_sold, revenue], ...]
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['business', 'order_id']
+
+    def __str__(self):
+        return f"{self.business} - {self.order_id} (v{self.version})"
+
+class SquarePendingOrder(models.Model):
+    """Order id received by the Square webhook, waiting to be fetched and applied."""
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="square_pending_orders")
+    order_id = models.CharField(max_length=64)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['business', 'order_id']
+
+    def __str__(self):
+        return f"{self.business} - {self.order_id}"
+
+class ProductPerformanceSnapshot(models.Model):
+    """
+    Performance classification of one product over the recent sales window.
+    Recomputed for the whole business nightly and after every ingestion (see sales.performance),
+    so readers get the classification without going back to the raw data points.
+    """
+    CATEGORY_CHOICES = (
+        ('top_10_percent', 'Top 10%'),
+        ('average', 'Average'),
+        ('bottom_10_percent', 'Bottom 10%'),
+    )
+    TREND_CHOICES = (
+        ('upward', 'Upward'),
+        ('flat', 'Flat'),
+        ('downward', 'Downward'),
+    )
+    business = models.ForeignKey(Business, on_delete=models.CASCADE, related_name="product_performance")
+    product_key = models.CharField(max_length=255)
+    product_name = models.CharField(max_length=255, null=True, blank=True)
+    rank = models.PositiveIntegerField()  # 0 is the highest revenue of the window
+    total_revenue = models.DecimalField(max_digits=12, decimal_places=2)
+    total_units = models.IntegerField()
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    trend = models.CharField(max_length=10, choices=TREND_CHOICES)
+    start_date = models.DateField()  # First and last day with sales in the window
+    end_date = models.DateField()
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['rank']
+        unique_together = ['business', 'product_key']
+        indexes = [
+            models.Index(fields=['business', 'rank'], name='sales_perf_business_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.business} - {self.product_name} ({self.category}, {self.trend})"
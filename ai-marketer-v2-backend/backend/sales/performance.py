@@ -0,0 +1,138 @@
+# backend/sales/performance.py
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+import numpy as np
+import pandas as pd
+from pytz import timezone
+
+from utils.square_api import get_square_menu_index
+
+from .models import ProductPerformanceSnapshot, SalesDataPoint
+from .trends import calculate_trends, get_trend_settings
+
+PERFORMANCE_FIELDS = ['product_key', 'product_name', 'date', 'revenue', 'units_sold']
+
+# Days of sales the snapshot classifies products over
+PERFORMANCE_WINDOW_DAYS = 30
+
+def compute_products_performance(business, days=PERFORMANCE_WINDOW_DAYS):
+    """
+    Analyses sales data to classify products based on performance and recent sales trends.
+
+    All sales rows of the window are read in a single query into a DataFrame. Total revenue and units sold are
+    computed per product, products are ranked, and the top and bottom 10% are classified as high-performing or
+    low-performing respectively. Recent sales trends (upward, downward, or flat) are evaluated for every product
+    at once using exponential moving average (EMA), see sales.trends.
+
+    Returns:
+        DataFrame indexed by product key, ordered by rank, with 'product_name', 'total_revenue',
+        'total_units', 'category' and 'trend' columns, and the first and last date with sales
+    """
+    # Calculate the date range
+    end_date = datetime.now(timezone('UTC')).date()
+    start_date = end_date - timedelta(days)
+
+    rows = SalesDataPoint.objects.filter(
+        business_id=business.id,
+        date__range=[start_date, end_date]
+    ).values_list(*PERFORMANCE_FIELDS)
+
+    df = pd.DataFrame.from_records(list(rows), columns=PERFORMANCE_FIELDS)
+    if df.empty:
+        return pd.DataFrame(columns=['product_name', 'total_revenue', 'total_units', 'category', 'trend']), None, None
+
+    df['revenue'] = df['revenue'].astype(float)
+
+    # Group the data by product key (so spellings of one product are merged) and calculate total revenue and units sold
+    totals = df.groupby('product_key', sort=False).agg(
+        product_name=('product_name', 'max'),
+        total_revenue=('revenue', 'sum'),
+        total_units=('units_sold', 'sum'),
+    )
+
+    # Sort products by total revenue in descending order
+    totals = totals.sort_values('total_revenue', ascending=False, kind='stable')
+
+    total = len(totals)
+    top_10_percent = max(int(total * 0.1), 1)
+    bottom_10_percent = max(int(total * 0.1), 1)
+
+    # Assign performance category by rank
+    rank = np.arange(total)
+    totals['category'] = np.where(
+        rank < top_10_percent,
+        'top_10_percent',
+        np.where(rank >= total - bottom_10_percent, 'bottom_10_percent', 'average')
+    )
+
+    # Calculate trends for every product at once, with the business's trend settings
+    trends = calculate_trends(df, **get_trend_settings(business))
+    totals['trend'] = trends['trend'].reindex(totals.index).fillna('flat')
+
+    return totals, df['date'].min(), df['date'].max()
+
+def refresh_product_performance_snapshot(business, days=PERFORMANCE_WINDOW_DAYS):
+    """Recompute the performance snapshot of a business, replacing every row in one transaction."""
+    totals, start_date, end_date = compute_products_performance(business, days)
+
+    snapshots = [
+        ProductPerformanceSnapshot(
+            business=business,
+            product_key=product_key,
+            product_name=product.product_name,
+            rank=rank,
+            total_revenue=Decimal(str(round(product.total_revenue, 2))),
+            total_units=int(product.total_units),
+            category=product.category,
+            trend=product.trend,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        for rank, (product_key, product) in enumerate(totals.iterrows())
+    ]
+
+    with transaction.atomic():
+        ProductPerformanceSnapshot.objects.filter(business=business).delete()
+        ProductPerformanceSnapshot.objects.bulk_create(snapshots)
+
+    return snapshots
+
+def get_products_performance(business):
+    """
+    Product classification of a business, read from its performance snapshot.
+    The snapshot is computed on the spot if the business doesn't have one yet.
+    """
+    snapshots = list(ProductPerformanceSnapshot.objects.filter(business=business).order_by('rank'))
+    if not snapshots:
+        snapshots = refresh_product_performance_snapshot(business)
+    if not snapshots:
+        return {'start_date': None, 'end_date': None, 'products': []}
+
+    # Get Square menu descriptions from the catalog snapshot, indexed by product key
+    menu_index = get_square_menu_index(business)
+
+    products = []
+    for snapshot in snapshots:
+        product_info = {
+            'product_name': snapshot.product_name,
+            'total_revenue': float(snapshot.total_revenue),
+            'total_units': snapshot.total_units,
+            'category': snapshot.category,
+            'trend': snapshot.trend,
+        }
+
+        # Add product description and price from square data
+        description_with_price = menu_index.get(snapshot.product_name)
+        if description_with_price:
+            product_info['description_with_price'] = description_with_price
+
+        products.append(product_info)
+
+    # The overall start_date and end_date of the analysis period
+    return {
+        'start_date': snapshots[0].start_date,
+        'end_date': snapshots[0].end_date,
+        'products': products
+    }
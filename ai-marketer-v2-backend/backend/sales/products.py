@@ -0,0 +1,55 @@
+# backend/sales/products.py
+import re
+import unicodedata
+
+# Trailing "(Large)" / "[Oat milk]" style variation labels
+VARIATION_SUFFIX_PATTERN = re.compile(r'\s*[\(\[][^\)\]]*[\)\]]\s*$')
+
+# Punctuation, underscores and runs of whitespace all collapse to one space
+SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+def normalize_product_name(name):
+    """
+    Key identifying a product regardless of case, spacing, punctuation or a
+    trailing variation label, e.g. "Flat  White (Large)" -> "flat white".
+    """
+    if not name:
+        return ''
+
+    key = unicodedata.normalize('NFKC', name).casefold()
+
+    # Keep the label when it is the whole name
+    while True:
+        stripped = VARIATION_SUFFIX_PATTERN.sub('', key)
+        if stripped == key or not stripped.strip():
+            break
+        key = stripped
+
+    return SEPARATOR_PATTERN.sub(' ', key).strip()
+
+class ProductIndex:
+    """
+    Dict lookup of values by product, matching any spelling of a product name
+    through its normalized key. The first value of each key wins.
+    """
+
+    def __init__(self, entries=(), normalized=False):
+        """
+        Args:
+            entries: Iterable of (product name or key, value)
+            normalized: True when the entries are already keyed by product key
+        """
+        self._index = {}
+        for name, value in entries:
+            key = name if normalized else normalize_product_name(name)
+            if key:
+                self._index.setdefault(key, value)
+
+    def get(self, name, default=None):
+        return self._index.get(normalize_product_name(name), default)
+
+    def __contains__(self, name):
+        return normalize_product_name(name) in self._index
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,12 @@
+# backend/sales/serializers.py
+from rest_framework import serializers
+
+from .models import SalesData
+
+class SalesDataSerializer(serializers.ModelSerializer):
+    """Serializer for uploaded sales data files"""
+
+    class Meta:
+        model = SalesData
+        fields = ['id', 'filename', 'file_type', 'uploaded_at', 'processed', 'processed_at']
+        read_only_fields = fields
@@ -0,0 +1,6 @@
+# backend/sales/signals.py
+from django.dispatch import Signal
+
+# Sent with business_id once the product performance of a business has been recomputed,
+# after new sales data was ingested or by the nightly refresh
+sales_data_updated = Signal()
@@ -0,0 +1,197 @@
+# backend/sales/tasks.py
+from datetime import timedelta
+import logging
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from businesses.models import Business
+from utils.locks import acquire_cache_lock, release_cache_lock
+from utils.square_api import fetch_and_save_square_orders, fetch_and_save_square_sales_data
+
+from .models import SalesDataPoint, SquarePendingOrder
+from .performance import refresh_product_performance_snapshot
+from .signals import sales_data_updated
+
+logger = logging.getLogger(__name__)
+
+# Longest a single business sync may hold its lock before another sync can start
+SQUARE_SYNC_LOCK_TIMEOUT = 60 * 30
+
+# Delay before webhook orders are applied again after a busy lock or a failure
+SQUARE_WEBHOOK_RETRY_SECONDS = 60
+
+# Ingestions within this delay share a single performance snapshot refresh
+PERFORMANCE_REFRESH_DELAY_SECONDS = 60
+
+def square_sync_lock_key(business_id):
+    return f"square:sync:lock:{business_id}"
+
+def is_square_sync_running(business_id):
+    return cache.get(square_sync_lock_key(business_id)) is not None
+
+def _webhook_scheduled_key(business_id):
+    return f"square:webhook:scheduled:{business_id}"
+
+def enqueue_square_webhook_orders(business_id, order_ids):
+    """
+    Queue order ids received from the Square webhook.
+    Only the first event of a burst schedules the apply task, so every order
+    received within the coalescing window is fetched and applied together.
+    """
+    SquarePendingOrder.objects.bulk_create(
+        [SquarePendingOrder(business_id=business_id, order_id=order_id) for order_id in order_ids],
+        ignore_conflicts=True
+    )
+
+    coalesce_seconds = settings.SQUARE_WEBHOOK_COALESCE_SECONDS
+    if cache.add(_webhook_scheduled_key(business_id), "scheduled", timeout=coalesce_seconds):
+        apply_square_webhook_orders_task.apply_async(args=[business_id], countdown=coalesce_seconds)
+
+def _performance_refresh_key(business_id):
+    return f"sales:performance:refresh:{business_id}"
+
+def schedule_product_performance_refresh(business_id):
+    """Queue a performance snapshot refresh after new sales data, unless one is already queued."""
+    try:
+        if cache.add(_performance_refresh_key(business_id), "queued", timeout=PERFORMANCE_REFRESH_DELAY_SECONDS):
+            refresh_product_performance_task.apply_async(args=[business_id], countdown=PERFORMANCE_REFRESH_DELAY_SECONDS)
+    except Exception as e:
+        logger.warning(f"Failed to schedule performance refresh for business {business_id}: {e}")
+
+@shared_task
+def refresh_product_performance_task(business_id):
+    """Recompute the product performance snapshot of one business."""
+    cache.delete(_performance_refresh_key(business_id))
+
+    business = Business.objects.filter(id=business_id).first()
+    if not business:
+        return
+
+    snapshots = refresh_product_performance_snapshot(business)
+    logger.info(f"✅ Refreshed performance of {len(snapshots)} products for business {business_id}")
+
+    sales_data_updated.send(sender=Business, business_id=business_id)
+
+@shared_task
+def refresh_all_product_performance_task():
+    """Refresh the performance snapshot of every business with sales data, as the window moves on each day."""
+    business_ids = list(
+        SalesDataPoint.objects.order_by('business_id').values_list('business_id', flat=True).distinct()
+    )
+    for business_id in business_ids:
+        refresh_product_performance_task.delay(business_id)
+
+    logger.info(f"Scheduled performance refresh for {len(business_ids)} businesses")
+
+@shared_task
+def sync_square_sales_task(business_id):
+    """Incrementally sync Square orders of one business, skipping if a sync is already running."""
+    lock_key = square_sync_lock_key(business_id)
+    lock_token = acquire_cache_lock(lock_key, SQUARE_SYNC_LOCK_TIMEOUT)
+    if not lock_token:
+        logger.info(f"Square sync already running for business {business_id}, skipping")
+        # A refresh requested while another sync holds the lock would otherwise stay queued
+        Business.objects.filter(id=business_id, square_sync_status='queued').update(square_sync_status='idle')
+        return
+
+    try:
+        business = Business.objects.filter(id=business_id).first()
+        if not business or not business.square_access_token:
+            Business.objects.filter(id=business_id, square_sync_status='queued').update(square_sync_status='idle')
+            return
+
+        Business.objects.filter(id=business_id).update(square_sync_status='running')
+
+        try:
+            fetch_and_save_square_sales_data(business)
+        except Exception as e:
+            logger.error(f"❌ Square sync failed for business {business_id}: {e}", exc_info=True)
+            Business.objects.filter(id=business_id).update(
+                square_sync_status='failed',
+                square_sync_error=str(e)
+            )
+            return
+
+        Business.objects.filter(id=business_id).update(square_sync_status='idle', square_sync_error=None)
+        schedule_product_performance_refresh(business_id)
+        logger.info(f"✅ Square sync completed for business {business_id}")
+    finally:
+        release_cache_lock(lock_key, lock_token)
+
+@shared_task
+def sync_all_square_sales_task():
+    """
+    Enqueue an incremental Square sync for every connected business.
+    Start times are spread over half of the schedule interval to avoid rate-limit spikes.
+    Webhook orders still queued, e.g. after their apply task ran out of retries, are applied again.
+    """
+    # Orders of a burst still being coalesced are left to the task the webhook scheduled
+    received_before = timezone.now() - timedelta(seconds=settings.SQUARE_WEBHOOK_COALESCE_SECONDS)
+    pending_business_ids = list(
+        SquarePendingOrder.objects.filter(received_at__lt=received_before)
+        .order_by('business_id').values_list('business_id', flat=True).distinct()
+    )
+    for business_id in pending_business_ids:
+        apply_square_webhook_orders_task.delay(business_id)
+
+    if pending_business_ids:
+        logger.info(f"Scheduled pending Square webhook orders for {len(pending_business_ids)} businesses")
+
+    business_ids = list(
+        Business.objects.exclude(square_access_token__isnull=True)
+        .exclude(square_access_token='')
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    if not business_ids:
+        return
+
+    spread_seconds = settings.SQUARE_SYNC_INTERVAL_MINUTES * 60 // 2
+    for index, business_id in enumerate(business_ids):
+        countdown = index * spread_seconds // len(business_ids)
+        sync_square_sales_task.apply_async(args=[business_id], countdown=countdown)
+
+    logger.info(f"Scheduled Square sync for {len(business_ids)} businesses")
+
+@shared_task(bind=True, max_retries=5)
+def apply_square_webhook_orders_task(self, business_id):
+    """Fetch and apply every order queued by the Square webhook for one business."""
+    lock_key = square_sync_lock_key(business_id)
+
+    # Shares the sync lock so webhook orders and polled pages are never applied concurrently
+    lock_token = acquire_cache_lock(lock_key, SQUARE_SYNC_LOCK_TIMEOUT)
+    if not lock_token:
+        apply_square_webhook_orders_task.apply_async(args=[business_id], countdown=SQUARE_WEBHOOK_RETRY_SECONDS)
+        return
+
+    order_ids = []
+    try:
+        business = Business.objects.filter(id=business_id).first()
+        if not business or not business.square_access_token:
+            SquarePendingOrder.objects.filter(business_id=business_id).delete()
+            return
+
+        pending = list(SquarePendingOrder.objects.filter(business=business).values_list('id', 'order_id'))
+        if not pending:
+            return
+
+        # Claim the queued ids first, so an order updated again meanwhile is queued anew
+        SquarePendingOrder.objects.filter(id__in=[pending_id for pending_id, _ in pending]).delete()
+        order_ids = [order_id for _, order_id in pending]
+
+        fetch_and_save_square_orders(business, order_ids)
+        schedule_product_performance_refresh(business_id)
+        logger.info(f"✅ Applied {len(order_ids)} Square webhook orders for business {business_id}")
+    except Exception as e:
+        logger.error(f"❌ Applying Square webhook orders failed for business {business_id}: {e}", exc_info=True)
+        if order_ids:
+            SquarePendingOrder.objects.bulk_create(
+                [SquarePendingOrder(business_id=business_id, order_id=order_id) for order_id in order_ids],
+                ignore_conflicts=True
+            )
+        raise self.retry(exc=e, countdown=SQUARE_WEBHOOK_RETRY_SECONDS)
+    finally:
+        release_cache_lock(lock_key, lock_token)
@@ -1,3 +1,383 @@
-from django.test import TestCase
+import base64
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import hashlib
+import hmac
+import json
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from businesses.models import Business
+from users.models import User
+from utils.locks import acquire_cache_lock
+from utils.square_api import _predates_order_records, save_square_orders, verify_square_webhook_signature
+
+from .models import SalesData, SalesDataPoint, SquareOrderRecord, SquarePendingOrder
+from .products import ProductIndex, normalize_product_name
+from .tasks import is_square_sync_running, square_sync_lock_key, sync_square_sales_task
+from .trends import MIN_ACTIVE_DAYS, calculate_trends
+
+END_DATE = date(2025, 3, 10)
+
+def sales_rows(daily_revenue):
+    """Sales rows of products from their daily revenue, the last value falling on END_DATE."""
+    rows = []
+    for product_key, revenues in daily_revenue.items():
+        first_day = END_DATE - timedelta(days=len(revenues) - 1)
+        for offset, revenue in enumerate(revenues):
+            rows.append({'product_key': product_key, 'date': first_day + timedelta(days=offset), 'revenue': revenue})
+    return pd.DataFrame(rows)
+
+class CalculateTrendsTest(SimpleTestCase):
+    """Golden values of calculate_trends over a 5 day window with a 0.5 smoothing factor."""
+
+    def calculate(self, daily_revenue, **kwargs):
+        options = {'end_date': END_DATE, 'window_days': 5, 'smoothing_factor': 0.5, 'threshold': 0.05}
+        options.update(kwargs)
+        return calculate_trends(sales_rows(daily_revenue), **options)
+
+    def assertTrend(self, trends, product_key, ema, slope, relative_change, trend):
+        row = trends.loc[product_key]
+        self.assertAlmostEqual(row['ema'], ema)
+        self.assertAlmostEqual(row['slope'], slope)
+        self.assertAlmostEqual(row['relative_change'], relative_change)
+        self.assertEqual(row['trend'], trend)
+
+    def test_upward_downward_and_flat(self):
+        trends = self.calculate({
+            'rising': [1, 2, 3, 4, 5],
+            'falling': [5, 4, 3, 2, 1],
+            'steady': [3, 3, 3, 3, 3],
+        })
+
+        self.assertTrend(trends, 'rising', ema=4.125, slope=1.0, relative_change=0.375, trend='upward')
+        self.assertTrend(trends, 'falling', ema=1.875, slope=-1.0, relative_change=-0.375, trend='downward')
+        self.assertTrend(trends, 'steady', ema=3.0, slope=0.0, relative_change=0.0, trend='flat')
+
+    def test_change_within_threshold_is_flat(self):
+        trends = self.calculate({'rising': [1, 2, 3, 4, 5]}, threshold=0.375)
+
+        self.assertTrend(trends, 'rising', ema=4.125, slope=1.0, relative_change=0.375, trend='flat')
+
+    def test_min_active_days_cutoff(self):
+        self.assertEqual(MIN_ACTIVE_DAYS, 3)
+        trends = self.calculate({
+            'two_days': [0, 0, 0, 10, 10],
+            'three_days': [0, 0, 10, 10, 10],
+        })
+
+        self.assertTrend(trends, 'two_days', ema=7.625, slope=3.0, relative_change=0.90625, trend='flat')
+        self.assertTrend(trends, 'three_days', ema=8.9375, slope=3.0, relative_change=0.4895833333, trend='upward')
+
+    def test_all_zero_days(self):
+        trends = self.calculate({'unsold': [0, 0, 0, 0, 0], 'rising': [1, 2, 3, 4, 5]})
+
+        self.assertTrend(trends, 'unsold', ema=0.0, slope=0.0, relative_change=0.0, trend='flat')
+        self.assertTrend(trends, 'rising', ema=4.125, slope=1.0, relative_change=0.375, trend='upward')
+
+    def test_single_day_series(self):
+        # The window ends on the only day with sales when no end date is given
+        trends = self.calculate({'new': [10]}, end_date=None)
+
+        self.assertTrend(trends, 'new', ema=5.0625, slope=2.0, relative_change=1.53125, trend='flat')
+
+    def test_no_sales(self):
+        trends = calculate_trends(pd.DataFrame(columns=['product_key', 'date', 'revenue']))
+
+        self.assertTrue(trends.empty)
+        self.assertEqual(list(trends.columns), ['ema', 'slope', 'relative_change', 'trend'])
+
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+def square_order(order_id, version, lines, state='COMPLETED', created_at='2025-03-10T02:00:00Z'):
+    """Square order payload with (name, quantity, price in cents) line items."""
+    return {
+        'id': order_id,
+        'version': version,
+        'state': state,
+        'created_at': created_at,
+        'line_items': [
+            {'name': name, 'quantity': str(quantity), 'base_price_money': {'amount': cents, 'currency': 'AUD'}}
+            for name, quantity, cents in lines
+        ],
+    }
+
+class SquareOrdersTestCase(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(email="owner@example.com", name="Owner", password="password")
+        self.business = Business.objects.create(
+            name="Test Cafe", owner=owner, square_access_token="token",
+            square_merchant_id="MERCHANT", timezone="Australia/Brisbane"
+        )
+
+    def square_totals(self):
+        """(units, revenue) of each Square product of the business."""
+        return {
+            point.product_name: (point.units_sold, point.revenue)
+            for point in SalesDataPoint.objects.filter(business=self.business, source='square')
+        }
+
+class SaveSquareOrdersTest(SquareOrdersTestCase):
+    def test_applies_the_difference_between_versions(self):
+        save_square_orders(self.business, [square_order('A', 1, [('Latte', 2, 500)])])
+        save_square_orders(self.business, [square_order('A', 2, [('Latte', 3, 500), ('Mocha', 1, 600)])])
+
+        self.assertEqual(self.square_totals(), {
+            'Latte': (3, Decimal('15.00')),
+            'Mocha': (1, Decimal('6.00')),
+        })
+        self.assertEqual(SquareOrderRecord.objects.get(business=self.business, order_id='A').version, 2)
+
+    def test_ignores_versions_already_applied(self):
+        save_square_orders(self.business, [square_order('A', 2, [('Latte', 3, 500)])])
+        save_square_orders(self.business, [square_order('A', 1, [('Latte', 2, 500)])])
+        save_square_orders(self.business, [square_order('A', 2, [('Latte', 3, 500)])])
+
+        self.assertEqual(self.square_totals(), {'Latte': (3, Decimal('15.00'))})
+
+    def test_cancelled_order_takes_back_its_sales(self):
+        save_square_orders(self.business, [
+            square_order('A', 1, [('Latte', 2, 500)]),
+            square_order('B', 1, [('Latte', 1, 500)]),
+        ])
+        save_square_orders(self.business, [square_order('A', 3, [('Latte', 2, 500)], state='CANCELED')])
+
+        self.assertEqual(self.square_totals(), {'Latte': (1, Decimal('5.00'))})
+
+        save_square_orders(self.business, [square_order('B', 2, [('Latte', 1, 500)], state='CANCELED')])
+
+        self.assertEqual(self.square_totals(), {})
+
+    def test_orders_synced_before_order_records_are_skipped(self):
+        self.business.last_square_sync_at = datetime(2025, 3, 11, tzinfo=dt_timezone.utc)
+        created_at = datetime(2025, 3, 10, 2, tzinfo=dt_timezone.utc)
+        record = SquareOrderRecord(business=self.business, order_id='A', version=1)
+
+        self.assertTrue(_predates_order_records(self.business, created_at, None))
+        self.assertFalse(_predates_order_records(self.business, created_at, record))
+        self.assertFalse(_predates_order_records(self.business, self.business.last_square_sync_at, None))
+
+        save_square_orders(self.business, [square_order('A', 2, [('Latte', 2, 500)])])
+
+        self.assertEqual(self.square_totals(), {})
+        self.assertFalse(SquareOrderRecord.objects.filter(business=self.business).exists())
+
+    def test_first_sync_applies_every_order(self):
+        self.assertFalse(_predates_order_records(self.business, datetime(2025, 3, 10, tzinfo=dt_timezone.utc), None))
+
+    def test_overlapping_batches_are_summed(self):
+        # Two locations syncing the same products and days, each page upserted on its own
+        save_square_orders(self.business, [
+            square_order('A', 1, [('Latte', 2, 500), ('Mocha', 1, 600)]),
+            square_order('B', 1, [('Latte', 1, 450)]),
+        ])
+        save_square_orders(self.business, [
+            square_order('C', 1, [('Latte', 3, 500)]),
+            square_order('D', 1, [('Mocha', 2, 600), ('Latte', 1, 450)]),
+        ])
+
+        points = {
+            (point.product_name, point.product_price): (point.units_sold, point.revenue)
+            for point in SalesDataPoint.objects.filter(business=self.business, source='square')
+        }
+        self.assertEqual(points, {
+            ('Latte', Decimal('5.00')): (5, Decimal('25.00')),
+            ('Latte', Decimal('4.50')): (2, Decimal('9.00')),
+            ('Mocha', Decimal('6.00')): (3, Decimal('18.00')),
+        })
+
+    @mock.patch('utils.square_api.SALES_POINT_UPSERT_BATCH_SIZE', 1)
+    def test_upsert_batches(self):
+        save_square_orders(self.business, [square_order('A', 1, [('Latte', 2, 500), ('Mocha', 1, 600)])])
+        save_square_orders(self.business, [square_order('B', 1, [('Mocha', 1, 600), ('Latte', 1, 500)])])
+
+        self.assertEqual(self.square_totals(), {
+            'Latte': (3, Decimal('15.00')),
+            'Mocha': (2, Decimal('12.00')),
+        })
+
+@override_settings(
+    SQUARE_WEBHOOK_SIGNATURE_KEY="signature-key",
+    SQUARE_WEBHOOK_URL="https://example.com/api/sales/square/webhook/",
+    CACHES=LOCAL_CACHE,
+)
+class SquareWebhookTest(SquareOrdersTestCase):
+    def sign(self, body, key="signature-key", url="https://example.com/api/sales/square/webhook/"):
+        return base64.b64encode(hmac.new(key.encode(), url.encode() + body, hashlib.sha256).digest()).decode()
+
+    def post_event(self, event, signature=None):
+        body = json.dumps(event).encode()
+        return self.client.post(
+            '/api/sales/square/webhook/',
+            data=body,
+            content_type='application/json',
+            headers={'x-square-hmacsha256-signature': signature if signature is not None else self.sign(body)},
+        )
+
+    def test_signature(self):
+        body = b'{"type": "order.updated"}'
+
+        self.assertTrue(verify_square_webhook_signature(body, self.sign(body)))
+        self.assertFalse(verify_square_webhook_signature(body + b' ', self.sign(body)))
+        self.assertFalse(verify_square_webhook_signature(body, self.sign(body, key="other-key")))
+        self.assertFalse(verify_square_webhook_signature(body, self.sign(body, url="https://example.com/other/")))
+        self.assertFalse(verify_square_webhook_signature(body, None))
+
+    def test_signature_without_key_is_rejected(self):
+        body = b'{"type": "order.updated"}'
+
+        with self.settings(SQUARE_WEBHOOK_SIGNATURE_KEY=None):
+            self.assertFalse(verify_square_webhook_signature(body, self.sign(body)))
+
+    def test_rejects_unsigned_events(self):
+        event = {'type': 'order.updated', 'merchant_id': 'MERCHANT', 'data': {'id': 'A'}}
+
+        response = self.post_event(event, signature=self.sign(b'{}'))
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(SquarePendingOrder.objects.exists())
+
+    @mock.patch('sales.tasks.apply_square_webhook_orders_task.apply_async')
+    def test_queues_signed_order_events(self, apply_async):
+        event = {'type': 'order.updated', 'merchant_id': 'MERCHANT', 'data': {'id': 'A'}}
+
+        self.assertEqual(self.post_event(event).status_code, 200)
+        self.assertEqual(self.post_event(event).status_code, 200)
+
+        self.assertEqual(
+            list(SquarePendingOrder.objects.values_list('business_id', 'order_id')),
+            [(self.business.id, 'A')]
+        )
+        apply_async.assert_called_once()
+
+@override_settings(CACHES=LOCAL_CACHE)
+class SyncSquareSalesTaskTest(SquareOrdersTestCase):
+    def test_skipped_sync_does_not_stay_queued(self):
+        Business.objects.filter(id=self.business.id).update(square_sync_status='queued')
+        acquire_cache_lock(square_sync_lock_key(self.business.id), 60)
+
+        with mock.patch('sales.tasks.fetch_and_save_square_sales_data') as fetch:
+            sync_square_sales_task(self.business.id)
+
+        fetch.assert_not_called()
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.square_sync_status, 'idle')
+
+    def test_keeps_a_lock_taken_by_another_worker(self):
+        lock_key = square_sync_lock_key(self.business.id)
+
+        def lock_expires_and_is_taken(business):
+            cache.delete(lock_key)
+            acquire_cache_lock(lock_key, 60)
+
+        with mock.patch('sales.tasks.fetch_and_save_square_sales_data', side_effect=lock_expires_and_is_taken), \
+                mock.patch('sales.tasks.schedule_product_performance_refresh'):
+            sync_square_sales_task(self.business.id)
+
+        self.assertTrue(is_square_sync_running(self.business.id))
+
+@override_settings(CACHES=LOCAL_CACHE)
+@mock.patch('sales.views.schedule_product_performance_refresh')
+class SalesFileUploadTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+        self.user = User.objects.create_user(email="owner@example.com", name="Owner", password="password")
+        self.business = Business.objects.create(name="Test Cafe", owner=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, name, rows):
+        content = "Date,Product Name,Price,Quantity\n" + "".join(f"{row}\n" for row in rows)
+        return self.client.post(
+            '/api/sales/',
+            {'file': SimpleUploadedFile(name, content.encode(), content_type='text/csv')},
+            format='multipart'
+        )
+
+    def upload_totals(self):
+        return {
+            (point.date.isoformat(), point.product_name): (point.units_sold, point.revenue)
+            for point in SalesDataPoint.objects.filter(business=self.business, source='upload')
+        }
+
+    def test_duplicate_upload_is_skipped(self, schedule_refresh):
+        rows = ["2025-03-10,Latte,5.00,2", "2025-03-10,Mocha,6.00,1"]
+
+        self.assertEqual(self.upload("march.csv", rows).status_code, 201)
+        response = self.upload("march-copy.csv", rows)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['duplicate'])
+        self.assertEqual(SalesData.objects.filter(business=self.business).count(), 1)
+        self.assertEqual(self.upload_totals(), {
+            ('2025-03-10', 'Latte'): (2, Decimal('10.00')),
+            ('2025-03-10', 'Mocha'): (1, Decimal('6.00')),
+        })
+
+    def test_delete_subtracts_only_the_file_share(self, schedule_refresh):
+        first = self.upload("first.csv", ["2025-03-10,Latte,5.00,2", "2025-03-10,Mocha,6.00,1"])
+        self.upload("second.csv", ["2025-03-10,Latte,5.00,3"])
+        # A zero row the deleted file never touched
+        SalesDataPoint.objects.create(
+            business=self.business, date=date(2025, 3, 9), product_name="Scone",
+            product_price=Decimal('4.00'), units_sold=0, revenue=Decimal('0.00'), source='upload'
+        )
+        sales_file = SalesData.objects.get(id=first.data['file_id'])
+        stored_name = sales_file.file.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f'/api/sales/files/{sales_file.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.upload_totals(), {
+            ('2025-03-10', 'Latte'): (3, Decimal('15.00')),
+            ('2025-03-09', 'Scone'): (0, Decimal('0.00')),
+        })
+        self.assertFalse(default_storage.exists(stored_name))
+
+    def test_file_is_kept_until_the_delete_commits(self, schedule_refresh):
+        response = self.upload("first.csv", ["2025-03-10,Latte,5.00,2"])
+        stored_name = SalesData.objects.get(id=response.data['file_id']).file.name
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.client.delete(f"/api/sales/files/{response.data['file_id']}/")
+
+        self.assertTrue(default_storage.exists(stored_name))
+        self.assertEqual(len(callbacks), 1)
+
+class NormalizeProductNameTest(SimpleTestCase):
+    def test_names(self):
+        cases = {
+            "Latte": "latte",
+            "  Flat  White ": "flat white",
+            "Flat-White": "flat white",
+            "flat_white": "flat white",
+            "Latte (Large)": "latte",
+            "Latte [Oat] (Large)": "latte",
+            "(Large)": "large",
+            "Ｃａｆé Latte": "café latte",
+            "Iced Latte (Large) - Oat": "iced latte large oat",
+            "": "",
+            None: "",
+        }
+        for name, key in cases.items():
+            with self.subTest(name=name):
+                self.assertEqual(normalize_product_name(name), key)
+
+    def test_product_index_matches_any_spelling(self):
+        index = ProductIndex([("Flat White", 1), ("flat white (Large)", 2), ("Mocha", 3)])
+
+        self.assertEqual(index.get("FLAT-WHITE"), 1)
+        self.assertIn("mocha [oat]", index)
+        self.assertIsNone(index.get("Latte"))
+        self.assertEqual(len(index), 2)
@@ -0,0 +1,101 @@
+# backend/sales/trends.py
+import numpy as np
+import pandas as pd
+
+# Products sold on fewer days of the window are always 'flat'
+MIN_ACTIVE_DAYS = 3
+
+def get_trend_settings(business):
+    """Trend parameters configured on the business, as keyword arguments of calculate_trends."""
+    return {
+        'window_days': business.trend_window_days,
+        'smoothing_factor': business.trend_smoothing_factor,
+        'threshold': business.trend_threshold,
+    }
+
+def daily_revenue_matrix(df, end_date, window_days):
+    """
+    Lay out revenue as one row per product and one column per day of the window.
+    Rows of the same product and day are summed and days without sales are 0.
+
+    Args:
+        df: Sales rows with 'product_key', 'date' and 'revenue' columns
+        end_date: Last day of the window
+        window_days: Number of days in the window
+
+    Returns:
+        DataFrame indexed by product key with a float64 column per day, oldest first
+    """
+    days = pd.date_range(end=pd.Timestamp(end_date), periods=window_days, freq='D')
+    window = df[pd.to_datetime(df['date']) >= days[0]]
+
+    matrix = window.assign(date=pd.to_datetime(window['date'])).pivot_table(
+        index='product_key', columns='date', values='revenue', aggfunc='sum'
+    )
+    products = pd.Index(df['product_key'].unique(), name='product_key')
+    return matrix.reindex(index=products, columns=days).fillna(0.0).astype(np.float64)
+
+def calculate_trends(df, end_date=None, window_days=14, smoothing_factor=0.1, threshold=0.05,
+                     min_active_days=MIN_ACTIVE_DAYS):
+    """
+    Calculates the sales trend of every product from its daily revenue over the window.
+
+    Each product's daily revenue (missing days filled with 0) goes through an
+    Exponential Moving Average seeded with the window average, oldest day first,
+    so the EMA ends weighted towards the most recent days. The trend is the
+    relative change of the final EMA over the window average, compared with the
+    threshold. The least-squares slope (revenue per day) is returned alongside.
+
+    Args:
+        df: Sales rows with 'product_key', 'date' and 'revenue' columns
+        end_date: Last day of the window, defaults to the latest date in df
+        window_days: Number of days (ending at end_date) the trend is measured over
+        smoothing_factor: Weight of each new day in the EMA, between 0 and 1
+        threshold: Relative change (0.05 = 5%) of the EMA over the window average below which a product is 'flat'
+        min_active_days: Products sold on fewer days of the window are 'flat'
+
+    Returns:
+        DataFrame indexed by product key with 'ema', 'slope', 'relative_change'
+        and 'trend' ('upward', 'downward' or 'flat') columns
+    """
+    columns = ['ema', 'slope', 'relative_change', 'trend']
+    if df.empty:
+        return pd.DataFrame(columns=columns, index=pd.Index([], name='product_key'))
+
+    if end_date is None:
+        end_date = df['date'].max()
+
+    matrix = daily_revenue_matrix(df, end_date, window_days)
+    revenues = matrix.to_numpy()
+
+    average = revenues.mean(axis=1)
+
+    # EMA over the days of the window, for all products at once
+    ema = average.copy()
+    for day in range(revenues.shape[1]):
+        ema = smoothing_factor * revenues[:, day] + (1 - smoothing_factor) * ema
+
+    # Least-squares slope of revenue against the day number
+    x = np.arange(revenues.shape[1], dtype=np.float64)
+    x_centered = x - x.mean()
+    slope = (revenues - average[:, None]) @ x_centered / (x_centered @ x_centered)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative_change = np.where(average > 0, (ema - average) / average, 0.0)
+
+    active_days = (revenues > 0).sum(axis=1)
+    trend = np.where(
+        (active_days < min_active_days) | (np.abs(relative_change) <= threshold),
+        'flat',
+        np.where(relative_change > 0, 'upward', 'downward')
+    )
+
+    return pd.DataFrame(
+        {
+            'ema': ema,
+            'slope': slope,
+            'relative_change': relative_change,
+            'trend': trend,
+        },
+        index=matrix.index
+    )
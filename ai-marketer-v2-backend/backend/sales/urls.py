@@ -1,9 +1,13 @@
 # backend/sales/urls.py
 from django.urls import path
 
-from .views import SalesDataView, RefreshSalesDataView
+from .views import SalesDataView, RefreshSalesDataView, SalesDataFileView, SalesExportView, SquareWebhookView
 
 urlpatterns = [
     path('', SalesDataView.as_view(), name='sales-data'),
-    path('refresh/', RefreshSalesDataView.as_view(), name='sales-refresh')
+    path('refresh/', RefreshSalesDataView.as_view(), name='sales-refresh'),
+    path('export/', SalesExportView.as_view(), name='sales-export'),
+    path('files/', SalesDataFileView.as_view(), name='sales-files'),
+    path('files/<int:pk>/', SalesDataFileView.as_view(), name='sales-file-detail'),
+    path('square/webhook/', SquareWebhookView.as_view(), name='square-webhook'),
 ]
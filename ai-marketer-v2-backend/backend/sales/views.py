@@ -1,25 +1,61 @@
 # backend/sales/views.py
-from collections import defaultdict
 import datetime
 from decimal import Decimal
+import hashlib
+import json
 import logging
 import os
 
-from django.db import transaction 
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery
 from django.db.models import Sum, Avg
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 import pandas as pd
 from pandas.errors import EmptyDataError
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from businesses.models import Business
-from utils.square_api import fetch_and_save_square_sales_data
+from businesses.tasks import schedule_square_catalog_refresh
+from utils.square_api import verify_square_webhook_signature
 
-from .models import SalesData, SalesDataPoint
+from .analytics import (
+    GRANULARITY_CHOICES,
+    build_line_datasets,
+    dense_period_index,
+    format_labels,
+    period_expression,
+    pivot_period_values,
+    resolve_granularity,
+)
+from .cache import (
+    bump_sales_cache_version,
+    get_cached_sales_chart,
+    get_sales_cache_version,
+    sales_chart_cache_key,
+    set_cached_sales_chart,
+)
+from .export import (
+    EXPORT_DATASETS,
+    EXPORT_FILE_TYPES,
+    get_export_rows,
+    parquet_available,
+    stream_csv,
+    stream_parquet,
+)
+from .models import SalesData, SalesDataContribution, SalesDataPoint
+from .products import normalize_product_name
+from .serializers import SalesDataSerializer
+from .tasks import (
+    enqueue_square_webhook_orders,
+    is_square_sync_running,
+    schedule_product_performance_refresh,
+    sync_square_sales_task,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -31,15 +67,27 @@ class SalesDataView(APIView):
     """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    default_top_n = 3
+    max_top_n = 20
+    series_labels = {
+        'day': "Daily Sales",
+        'week': "Weekly Sales",
+        'month': "Monthly Sales",
+    }
 
     def get(self, request):
         """
         Get sales data chart for the authenticated user's business.
         
         This endpoint returns:
-        1. Overall daily revenue chart
-        2. Top 5 best-selling products
-        3. Bottom 5 worst-selling products
+        1. Overall revenue chart
+        2. Top N best-selling products
+        3. Bottom N worst-selling products
+
+        Query parameters:
+        - start_date / end_date: YYYY-MM-DD, defaults to the last 30 days
+        - granularity: day, week or month, chosen from the range length if omitted
+        - n: number of top/bottom products (default 3)
         """
         business = Business.objects.filter(owner=request.user).first()
         if not business:
@@ -64,18 +112,44 @@ class SalesDataView(APIView):
                 end_date = datetime.datetime.strptime(end_date_param, '%Y-%m-%d').date()
             except ValueError:
                 pass
+
+        granularity_param = request.query_params.get('granularity')
+        if granularity_param and granularity_param not in GRANULARITY_CHOICES:
+            return Response({
+                "error": f"Invalid granularity. Choose one of: {', '.join(GRANULARITY_CHOICES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        granularity = resolve_granularity(granularity_param, start_date, end_date)
+
+        try:
+            top_n = int(request.query_params.get('n', self.default_top_n))
+        except ValueError:
+            return Response({"error": "n must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+        top_n = min(max(top_n, 1), self.max_top_n)
+
+        # Serve repeat visits straight from the cache until new data is ingested
+        cache_version = get_sales_cache_version(business.id)
+        cache_key = None
+        if cache_version is not None:
+            cache_key = sales_chart_cache_key(
+                business.id, cache_version, start_date, end_date, granularity, top_n
+            )
+            cached_payload = get_cached_sales_chart(cache_key)
+            if cached_payload is not None:
+                return Response(cached_payload)
         
-        # 1. Get overall daily sales data
+        # 1. Get overall sales data, bucketed in the database
         data_points = SalesDataPoint.objects.filter(
             business=business,
             date__gte=start_date,
             date__lte=end_date
-        ).values('date').annotate(
+        ).annotate(
+            period=period_expression(granularity)
+        ).values('period').annotate(
             total_revenue=Sum('revenue')
-        ).order_by('date')
+        ).order_by('period')
         
         if not data_points.exists():
-            return Response({
+            payload = {
                 "overall_sales": {
                     "square_connected": bool(business.square_access_token),
                     "labels": [],
@@ -89,19 +163,29 @@ class SalesDataView(APIView):
                     "chart": {"labels": [], "datasets": []},
                     "summary": []
                 }
-            })
+            }
+            if cache_key:
+                set_cached_sales_chart(cache_key, payload)
+            return Response(payload)
         
+        # Build a dense period index so periods without sales are plotted as zero
+        period_totals = list(data_points)
+        period_index = dense_period_index(
+            period_totals[0]['period'], period_totals[-1]['period'], granularity
+        )
+
         # Format the date labels for chart.js (common for all charts)
-        labels = [entry['date'].strftime('%d-%m-%Y') for entry in data_points]
+        labels = format_labels(period_index, granularity)
         
         # Format the overall revenue data
-        values = [float(entry['total_revenue']) for entry in data_points]
+        overall_pivot = pivot_period_values(period_totals, period_index, 'total_revenue')
+        values = overall_pivot['total_revenue'].round(2).tolist()
         
         overall_chart_data = {
             "square_connected": bool(business.square_access_token),
             "labels": labels,
             "datasets": [{
-                "label": "Daily Sales",
+                "label": self.series_labels[granularity],
                 "data": values,
                 "fill": False,
                 "borderColor": "rgb(75, 192, 192)",
@@ -121,97 +205,48 @@ class SalesDataView(APIView):
             average_price=Avg('product_price')
         ).order_by('-total_units')
         
-        # Get top 3 and bottom 3 products
-        top_products = list(product_data[:3])
-        bottom_products = list(product_data.order_by('total_units')[:3])
+        # Get top N and bottom N products
+        top_products = list(product_data[:top_n])
+        bottom_products = list(product_data.order_by('total_units')[:top_n])
         
         # 3. Get all product sales by date for selected products
         top_product_names = [p['product_name'] for p in top_products if p['product_name']]
         bottom_product_names = [p['product_name'] for p in bottom_products if p['product_name']]
         
-        # Get daily data for all products in the selected groups
-        daily_product_data = SalesDataPoint.objects.filter(
+        # Get per-period data for all products in the selected groups
+        period_product_data = SalesDataPoint.objects.filter(
             business=business,
             date__gte=start_date,
             date__lte=end_date,
-            product_name__in=top_product_names + bottom_product_names
-        ).values('date', 'product_name').annotate(
-            daily_revenue=Sum('revenue')
-        ).order_by('date')
-        
-        # Organize data by product and date
-        top_products_by_date = defaultdict(lambda: defaultdict(float))
-        bottom_products_by_date = defaultdict(lambda: defaultdict(float))
-        
-        # Fill data for each day and product
-        for entry in daily_product_data:
-            date_str = entry['date'].strftime('%d-%m-%Y')
-            product_name = entry['product_name']
-            revenue = float(entry['daily_revenue'])
-            
-            # Store in correct category (top or bottom)
-            if product_name in top_product_names:
-                top_products_by_date[date_str][product_name] = revenue
-            
-            if product_name in bottom_product_names:
-                bottom_products_by_date[date_str][product_name] = revenue
-        
-        # Create datasets for chart.js
-        top_datasets = []
-        bottom_datasets = []
+            product_name__in=set(top_product_names + bottom_product_names)
+        ).annotate(
+            period=period_expression(granularity)
+        ).values('period', 'product_name').annotate(
+            period_revenue=Sum('revenue')
+        ).order_by('period')
         
-        # Colors for the charts
-        colors = ['#FF6384', '#36A2EB', '#FFCE56']
-        
-        # Create datasets for top products
-        for i, product_name in enumerate(top_product_names):
-            if not product_name:
-                continue
-
-            data = []
-            
-            for date_str in labels:
-                data.append(top_products_by_date[date_str][product_name])
-            
-            top_datasets.append({
-                "label": product_name,
-                "data": data,
-                "fill": False,
-                "borderColor": colors[i % len(colors)],
-                "tension": 0.1
-            })
-        
-        # Create datasets for bottom products
-        for i, product_name in enumerate(bottom_product_names):
-            if not product_name:
-                continue
-                
-            data = []
-            
-            for date_str in labels:
-                data.append(bottom_products_by_date[date_str][product_name])
-            
-            bottom_datasets.append({
-                "label": product_name,
-                "data": data,
-                "fill": False,
-                "borderColor": colors[i % len(colors)],
-                "tension": 0.1
-            })
+        # Pivot once into a (period x product) frame, then slice out each group
+        product_pivot = pivot_period_values(
+            period_product_data,
+            period_index,
+            'period_revenue',
+            column_key='product_name',
+            columns=list(dict.fromkeys(top_product_names + bottom_product_names)),
+        )
         
         # Create final chart data format
         top_chart = {
             "labels": labels,
-            "datasets": top_datasets
+            "datasets": build_line_datasets(product_pivot[top_product_names])
         }
         
         bottom_chart = {
             "labels": labels,
-            "datasets": bottom_datasets
+            "datasets": build_line_datasets(product_pivot[bottom_product_names])
         }
         
         # Prepare the final response
-        return Response({
+        payload = {
             "overall_sales": overall_chart_data,
             "top_products": {
                 "chart": top_chart,
@@ -221,7 +256,10 @@ class SalesDataView(APIView):
                 "chart": bottom_chart,
                 "summary": bottom_products
             }
-        })
+        }
+        if cache_key:
+            set_cached_sales_chart(cache_key, payload)
+        return Response(payload)
     
     def post(self, request):
         """Handle sales data file upload"""
@@ -241,15 +279,10 @@ class SalesDataView(APIView):
             return Response({"error": f"Unsupported file format: {file_extension}. Please upload CSV."}, 
                             status=status.HTTP_400_BAD_REQUEST)
         
-        # Create sales data record
-        sales_data = SalesData.objects.create(
-            business=business,
-            file=file_obj,
-            filename=filename,
-            file_type=file_extension,
-            processed=True,
-            processed_at=timezone.now()
-        )
+        # Skip files that were already ingested, otherwise every unit would be counted twice
+        content_hash = self._hash_file(file_obj)
+        if SalesData.objects.filter(business=business, content_hash=content_hash).exists():
+            return self._duplicate_upload_response()
         
         try:
             file_obj.seek(0)
@@ -308,46 +341,84 @@ class SalesDataView(APIView):
 
             records_to_update = []
             records_to_create = []
+            contributions = []
 
             for _, row in grouped_df.iterrows():
                 date = row['DateOnly']
                 product_name = row['Product Name']
-                price = float(row['Price'])
+                price = Decimal(str(row['Price'])).quantize(Decimal('0.01'))
                 quantity = int(row['Quantity'])
-                revenue = float(row['Revenue'])
+                revenue = price * quantity
                 
+                # Prices are compared as Decimals so they match the stored product_price
                 key = (date, product_name, price)
                 
                 if key in existing_records:
                     record = existing_records[key]
                     record.units_sold += quantity
-                    record.revenue += Decimal(str(revenue))
+                    record.revenue += revenue
                     records_to_update.append(record)
                 else:
                     record = SalesDataPoint(
                         business=business,
                         date=date,
                         product_name=product_name,
+                        product_key=normalize_product_name(product_name),
                         product_price=price,
                         units_sold=quantity,
                         revenue=revenue,
-                        source_file=sales_data,
                         source='upload'
                     )
                     records_to_create.append(record)
 
-            with transaction.atomic():
-                if records_to_update:
-                    SalesDataPoint.objects.bulk_update(
-                        records_to_update, 
-                        ['units_sold', 'revenue']
+                contributions.append((record, quantity, revenue))
+
+            try:
+                with transaction.atomic():
+                    # Create sales data record
+                    sales_data = SalesData.objects.create(
+                        business=business,
+                        file=file_obj,
+                        filename=filename,
+                        file_type=file_extension,
+                        content_hash=content_hash,
+                        processed=True,
+                        processed_at=timezone.now()
                     )
-                
-                if records_to_create:
-                    SalesDataPoint.objects.bulk_create(records_to_create)
+
+                    if records_to_update:
+                        SalesDataPoint.objects.bulk_update(
+                            records_to_update, 
+                            ['units_sold', 'revenue']
+                        )
+                    
+                    if records_to_create:
+                        for record in records_to_create:
+                            record.source_file = sales_data
+                        SalesDataPoint.objects.bulk_create(records_to_create)
+
+                    # Remember what this file added so it can be removed on its own later
+                    SalesDataContribution.objects.bulk_create([
+                        SalesDataContribution(
+                            sales_file=sales_data,
+                            data_point=record,
+                            units_sold=quantity,
+                            revenue=revenue
+                        )
+                        for record, quantity, revenue in contributions
+                    ])
+            except IntegrityError:
+                # The same file was ingested by a concurrent request
+                if SalesData.objects.filter(business=business, content_hash=content_hash).exists():
+                    return self._duplicate_upload_response()
+                raise
+
+            bump_sales_cache_version(business.id)
+            schedule_product_performance_refresh(business.id)
             
             return Response({
                 "success": True,
+                "file_id": sales_data.id,
                 "message": f"Successfully uploaded."
             }, status=status.HTTP_201_CREATED)
         
@@ -358,21 +429,230 @@ class SalesDataView(APIView):
             logger.error(f"❌ CSV upload failed — {str(e)}", exc_info=True)
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    def _hash_file(self, file_obj):
+        """Return the SHA-256 hex digest of an uploaded file."""
+        digest = hashlib.sha256()
+        for chunk in file_obj.chunks():
+            digest.update(chunk)
+        file_obj.seek(0)
+        return digest.hexdigest()
+
+    def _duplicate_upload_response(self):
+        return Response({
+            "success": True,
+            "duplicate": True,
+            "message": "This file has already been uploaded."
+        }, status=status.HTTP_200_OK)
+
 class RefreshSalesDataView(APIView):
     """
     API view for refreshing sales data from Square.
+    GET: Status of the background Square sync.
+    POST: Queue a Square sync for the authenticated user's business.
     """
     permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Return the state of the last Square sync"""
+        business = Business.objects.filter(owner=request.user).first()
+        if not business:
+            return Response({"error": "Business not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(self._sync_status(business), status=status.HTTP_200_OK)
     
     def post(self, request):
-        """Refresh sales data from Square API"""
+        """Queue a refresh of the sales data from Square API"""
         business = Business.objects.filter(owner=request.user).first()
         if not business:
             return Response({"error": "Business not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        if not business.square_access_token:
+            return Response({"error": "Square not connected"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # A sync for this business is already in progress, so don't queue another one
+        if is_square_sync_running(business.id):
+            return Response({"success": True, **self._sync_status(business)}, status=status.HTTP_202_ACCEPTED)
+
         try:
-            fetch_and_save_square_sales_data(business)
-            return Response({"success": True}, status=status.HTTP_200_OK)
+            business.square_sync_status = 'queued'
+            business.save(update_fields=['square_sync_status'])
+            sync_square_sales_task.delay(business.id)
+            return Response({"success": True, **self._sync_status(business)}, status=status.HTTP_202_ACCEPTED)
         except Exception as e:
             logger.error("❌ Refresh sales data failed — %s", str(e), exc_info=True)
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _sync_status(self, business):
+        return {
+            "sync_status": business.square_sync_status,
+            "sync_error": business.square_sync_error,
+            "last_sync_at": business.last_square_sync_at,
+        }
+
+class SquareWebhookView(APIView):
+    """
+    Receiver for Square order webhooks.
+    POST: Queue the created/updated order to be applied to the sales data,
+          or a catalog snapshot refresh when the catalog changed.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    ORDER_EVENT_TYPES = ('order.created', 'order.updated')
+    CATALOG_EVENT_TYPE = 'catalog.version.updated'
+
+    def post(self, request):
+        signature = request.headers.get('x-square-hmacsha256-signature')
+        if not verify_square_webhook_signature(request.body, signature):
+            logger.warning("⚠️ Square webhook rejected: invalid signature")
+            return Response({"error": "Invalid signature"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            event = json.loads(request.body)
+        except ValueError:
+            return Response({"error": "Invalid payload"}, status=status.HTTP_400_BAD_REQUEST)
+
+        event_type = event.get('type')
+
+        # Acknowledge other event types so Square doesn't retry them
+        if event_type not in self.ORDER_EVENT_TYPES and event_type != self.CATALOG_EVENT_TYPE:
+            return Response({"success": True}, status=status.HTTP_200_OK)
+
+        merchant_id = event.get('merchant_id')
+        if not merchant_id:
+            return Response({"error": "Missing merchant id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        business_ids = Business.objects.filter(
+            square_merchant_id=merchant_id,
+            square_access_token__isnull=False
+        ).values_list('id', flat=True)
+
+        if event_type == self.CATALOG_EVENT_TYPE:
+            for business_id in business_ids:
+                schedule_square_catalog_refresh(business_id)
+            return Response({"success": True}, status=status.HTTP_200_OK)
+
+        order_id = (event.get('data') or {}).get('id')
+        if not order_id:
+            return Response({"error": "Missing order id"}, status=status.HTTP_400_BAD_REQUEST)
+
+        for business_id in business_ids:
+            enqueue_square_webhook_orders(business_id, [order_id])
+
+        return Response({"success": True}, status=status.HTTP_200_OK)
+
+class SalesExportView(APIView):
+    """
+    API view for exporting sales data.
+    GET: Stream the raw sales data points or the product performance table as CSV or Parquet.
+
+    Query parameters:
+    - type: raw (default) or products
+    - file_type: csv (default) or parquet
+    - start_date / end_date: YYYY-MM-DD, optional filters for raw exports
+    """
+    permission_classes = [IsAuthenticated]
+
+    content_types = {
+        'csv': 'text/csv',
+        'parquet': 'application/vnd.apache.parquet',
+    }
+
+    def get(self, request):
+        business = Business.objects.filter(owner=request.user).first()
+        if not business:
+            return Response({"error": "Business not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        dataset = request.query_params.get('type', 'raw')
+        if dataset not in EXPORT_DATASETS:
+            return Response({
+                "error": f"Invalid type. Choose one of: {', '.join(EXPORT_DATASETS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        file_type = request.query_params.get('file_type', 'csv')
+        if file_type not in EXPORT_FILE_TYPES:
+            return Response({
+                "error": f"Invalid file_type. Choose one of: {', '.join(EXPORT_FILE_TYPES)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if file_type == 'parquet' and not parquet_available():
+            return Response({"error": "Parquet export is not available on this server."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        date_filters = {}
+        for param in ('start_date', 'end_date'):
+            value = request.query_params.get(param)
+            if value:
+                try:
+                    date_filters[param] = datetime.datetime.strptime(value, '%Y-%m-%d').date()
+                except ValueError:
+                    return Response({"error": f"{param} must be in YYYY-MM-DD format"},
+                                    status=status.HTTP_400_BAD_REQUEST)
+
+        columns, rows = get_export_rows(business, dataset, **date_filters)
+        stream = stream_parquet(columns, rows) if file_type == 'parquet' else stream_csv(columns, rows)
+
+        filename = f"sales_{dataset}_{datetime.date.today().isoformat()}.{file_type}"
+        response = StreamingHttpResponse(stream, content_type=self.content_types[file_type])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class SalesDataFileView(APIView):
+    """
+    API view for managing uploaded sales data files.
+    GET: List the uploaded files of the authenticated user's business, or retrieve one.
+    DELETE: Remove a file and subtract everything it contributed to the sales data.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk=None):
+        business = Business.objects.filter(owner=request.user).first()
+        if not business:
+            return Response({"error": "Business not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        files = SalesData.objects.filter(business=business)
+        if pk is not None:
+            try:
+                return Response(SalesDataSerializer(files.get(pk=pk)).data)
+            except SalesData.DoesNotExist:
+                return Response({"error": "Sales file not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(SalesDataSerializer(files, many=True).data)
+
+    def delete(self, request, pk):
+        business = Business.objects.filter(owner=request.user).first()
+        if not business:
+            return Response({"error": "Business not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            sales_data = SalesData.objects.get(pk=pk, business=business)
+        except SalesData.DoesNotExist:
+            return Response({"error": "Sales file not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        file_contribution = SalesDataContribution.objects.filter(
+            sales_file=sales_data,
+            data_point=OuterRef('pk')
+        )
+
+        file_points = SalesDataPoint.objects.filter(contributions__sales_file=sales_data)
+        stored_file = sales_data.file
+
+        with transaction.atomic():
+            # Subtract the file's share from every row it touched in a single UPDATE
+            file_points.update(
+                units_sold=F('units_sold') - Subquery(file_contribution.values('units_sold')[:1]),
+                revenue=F('revenue') - Subquery(file_contribution.values('revenue')[:1])
+            )
+
+            # Rows of this file that no other file contributes to are now empty
+            file_points.filter(units_sold__lte=0).delete()
+
+            sales_data.delete()
+
+            # Keep the file while the rows it describes can still be rolled back
+            transaction.on_commit(lambda: stored_file.delete(save=False))
+
+        bump_sales_cache_version(business.id)
+        schedule_product_performance_refresh(business.id)
+
+        return Response({"message": "Sales file deleted successfully"}, status=status.HTTP_200_OK)
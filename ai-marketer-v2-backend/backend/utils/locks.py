@@ -0,0 +1,19 @@
+# backend/utils/locks.py
+import uuid
+
+from django.core.cache import cache
+
+def acquire_cache_lock(key, timeout):
+    """
+    Take a lock held in the shared cache for at most `timeout` seconds.
+
+    Returns:
+        Token of this holder, or None if the lock is already held
+    """
+    token = uuid.uuid4().hex
+    return token if cache.add(key, token, timeout=timeout) else None
+
+def release_cache_lock(key, token):
+    """Release a lock, unless it expired and another holder has taken it since."""
+    if cache.get(key) == token:
+        cache.delete(key)
@@ -1,28 +1,96 @@
 # backend/utils/square_api.py
 import base64
-from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date as date_cls, datetime, timedelta
 from decimal import Decimal
+from functools import lru_cache
+import hashlib
+import hmac
 import logging
 import secrets
+import uuid
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from django.conf import settings
-from django.db import transaction 
+from django.db import connection, transaction
 from pytz import timezone
 from square.client import Client
 
+from businesses.models import SquareCatalogObject
 from businesses.serializers import SquareItemSerializer
-from sales.models import SalesDataPoint
+from config.constants import DEFAULT_BUSINESS_TIMEZONE
+from sales.cache import bump_sales_cache_version
+from sales.models import SalesDataPoint, SquareOrderRecord, SquareSyncCursor
+from sales.products import ProductIndex, normalize_product_name
 
 logger = logging.getLogger(__name__)
 
+# Orders per /v2/orders/search page (Default: 500 Max: 1000)
+SQUARE_ORDERS_PAGE_SIZE = 1000
+
+# Order ids per /v2/orders/batch-retrieve request (Max: 100)
+SQUARE_BATCH_RETRIEVE_LIMIT = 100
+
+# Catalog objects per search page / batch retrieve (Max: 1000)
+SQUARE_CATALOG_PAGE_SIZE = 1000
+
+# Catalog snapshots older than this are refreshed in the background
+SQUARE_CATALOG_MAX_AGE = timedelta(minutes=5)
+
+# Square clients kept per process, keyed by business and token
+SQUARE_CLIENT_CACHE_SIZE = 256
+
+# Timeout (seconds) and retries of every Square HTTP request
+SQUARE_HTTP_TIMEOUT = 30
+SQUARE_HTTP_MAX_RETRIES = 3
+SQUARE_HTTP_BACKOFF_FACTOR = 0.5
+SQUARE_HTTP_RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+# Sales data points per upsert statement of save_square_orders
+SALES_POINT_UPSERT_BATCH_SIZE = 1000
+
+@lru_cache(maxsize=1)
+def get_square_session():
+    """
+    Pooled requests session shared by every Square call of this process,
+    SDK clients included. Rate limits and server errors are retried with
+    backoff (honouring Retry-After).
+    """
+    retry = Retry(
+        total=SQUARE_HTTP_MAX_RETRIES,
+        backoff_factor=SQUARE_HTTP_BACKOFF_FACTOR,
+        status_forcelist=SQUARE_HTTP_RETRY_STATUSES,
+        allowed_methods=None,  # Square reads like orders search are POSTs
+        raise_on_status=False
+    )
+    # Enough pooled connections for every location synced in parallel
+    adapter = HTTPAdapter(max_retries=retry, pool_maxsize=max(10, settings.SQUARE_SYNC_MAX_WORKERS))
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+@lru_cache(maxsize=SQUARE_CLIENT_CACHE_SIZE)
+def _get_cached_square_client(business_id, access_token):
+    return Client(
+        access_token=access_token,
+        environment=settings.SQUARE_ENV,
+        http_client_instance=get_square_session(),
+        timeout=SQUARE_HTTP_TIMEOUT
+    )
+
 def get_square_client(business):
-    """Initialize Square client from business token."""
+    """Return the Square client of a business, reused while its token doesn't change."""
     access_token = business.square_access_token
     if not access_token:
         logger.warning(f"No Square access token for business {business.id}")
         return None
-    return Client(access_token=access_token, environment=settings.SQUARE_ENV)
+    return _get_cached_square_client(business.id, access_token)
 
 def get_square_locations(client):
     """Fetch list of locations."""
@@ -41,22 +109,6 @@ def get_square_locations(client):
         logger.error(f"Square locations fetch error: {e}")
     return []
 
-def get_square_items(client):
-    """Fetch list of items."""
-    try:
-        catalog_api = client.catalog
-        catalog_response = catalog_api.list_catalog(
-            cursor=None,
-            types=["ITEM"]
-        )
-        if catalog_response.is_success():
-            items = catalog_response.body.get("objects", [])
-            return items
-        logger.warning("Failed to fetch Square items")
-    except Exception as e:
-        logger.error(f"Square items fetch error: {e}")
-    return []
-
 def process_square_item(item, output_format="detail"):
     """
     Process a Square catalog item with flexible output formats.
@@ -156,6 +208,263 @@ def process_square_item(item, output_format="detail"):
             "categories": categories
         }
 
+def build_square_item_update(current_item, changes):
+    """
+    Build the ITEM object to upsert from the current catalog item and the requested changes.
+
+    Args:
+        current_item: Catalog item as returned by Square (with its latest version)
+        changes: Dict with optional "name", "description" and "variations"
+            ([{"id", "name", "price_money"}, ...])
+
+    Returns:
+        Catalog object carrying the current item and variation versions
+    """
+    item_id = current_item["id"]
+    current_item_data = current_item.get("item_data", {})
+    current_variations = current_item_data.get("variations", [])
+
+    # Get variation versions
+    variation_versions = {
+        variation["id"]: variation["version"]
+        for variation in current_variations
+        if "id" in variation and "version" in variation
+    }
+
+    # Fields other than name and price are carried over from the first variation
+    base_variation_data = {
+        k: v for k, v in (current_variations[0].get("item_variation_data", {}) if current_variations else {}).items()
+        if k not in ["name", "pricing_type", "price_money"]
+    }
+
+    formatted_variations = [
+        {
+            "type": "ITEM_VARIATION",
+            "id": v["id"],
+            "version": variation_versions.get(v["id"]),
+            "item_variation_data": {
+                **base_variation_data,
+                "item_id": item_id,
+                "name": v["name"],
+                "pricing_type": "FIXED_PRICING",
+                "price_money": v["price_money"],
+            }
+        }
+        for v in changes.get("variations", [])
+    ]
+
+    return {
+        "type": "ITEM",
+        "id": item_id,
+        "version": current_item["version"],
+        "item_data": {
+            **current_item_data,
+            "name": changes.get("name", current_item_data.get("name")),
+            "description": changes.get("description", current_item_data.get("description", "")),
+            "variations": formatted_variations,
+        }
+    }
+
+def batch_update_square_items(business, item_changes):
+    """
+    Apply changes to many catalog items with as few Square round trips as possible.
+
+    Current versions are read with batch_retrieve_catalog_objects and the updated
+    items are written with batch_upsert_catalog_objects, each request holding at
+    most SQUARE_CATALOG_PAGE_SIZE objects (variations included). A failed
+    request only fails the items it carried.
+
+    Args:
+        business: Business whose catalog is updated
+        item_changes: List of {"id", "name"?, "description"?, "variations"?}
+
+    Returns:
+        List of {"id", "success", "error"?} in the order of item_changes
+    """
+    client = get_square_client(business)
+    catalog_api = client.catalog
+    results = {changes["id"]: {"id": changes["id"], "success": False} for changes in item_changes}
+
+    # Fetch the latest versions of every item
+    item_ids = list(results)
+    current_items = {}
+    for start in range(0, len(item_ids), SQUARE_CATALOG_PAGE_SIZE):
+        response = catalog_api.batch_retrieve_catalog_objects(
+            body={"object_ids": item_ids[start:start + SQUARE_CATALOG_PAGE_SIZE]}
+        )
+        if not response.is_success():
+            raise Exception(f"Square catalog retrieve failed: {response.errors}")
+        for obj in response.body.get("objects", []):
+            if obj.get("type") == "ITEM" and not obj.get("is_deleted"):
+                current_items[obj["id"]] = obj
+
+    # Group the updated items into requests of at most SQUARE_CATALOG_PAGE_SIZE objects
+    batches = [[]]
+    batch_sizes = [0]
+    for changes in item_changes:
+        current_item = current_items.get(changes["id"])
+        if current_item is None:
+            results[changes["id"]]["error"] = "Item not found"
+            continue
+
+        updated_item = build_square_item_update(current_item, changes)
+        object_count = 1 + len(updated_item["item_data"]["variations"])
+        if batch_sizes[-1] + object_count > SQUARE_CATALOG_PAGE_SIZE:
+            batches.append([])
+            batch_sizes.append(0)
+        batches[-1].append(updated_item)
+        batch_sizes[-1] += object_count
+
+    for batch in batches:
+        if not batch:
+            continue
+
+        response = catalog_api.batch_upsert_catalog_objects(body={
+            "idempotency_key": str(uuid.uuid4()),
+            "batches": [{"objects": batch}]
+        })
+
+        if not response.is_success():
+            logger.error(f"Failed to batch update {len(batch)} items: {response.errors}")
+            for item in batch:
+                results[item["id"]]["error"] = response.errors
+            continue
+
+        save_square_catalog_objects(business, [
+            obj for obj in response.body.get("objects", []) if obj.get("type") == "ITEM"
+        ])
+        for item in batch:
+            results[item["id"]]["success"] = True
+
+    return [results[changes["id"]] for changes in item_changes]
+
+def refresh_square_catalog(business):
+    """
+    Bring the catalog snapshot of a business up to date.
+
+    The first refresh loads the whole catalog. Later ones only ask Square for
+    objects changed since the previous refresh (begin_time), deletions included,
+    following every cursor. Items of changed variations are re-fetched so the
+    snapshot always holds items with their current variations.
+    """
+    client = get_square_client(business)
+    if client is None:
+        return
+
+    catalog_api = client.catalog
+    body = {
+        "object_types": ["ITEM", "ITEM_VARIATION", "CATEGORY"],
+        "limit": SQUARE_CATALOG_PAGE_SIZE
+    }
+    if business.square_catalog_synced_at:
+        body["begin_time"] = business.square_catalog_synced_at.isoformat()
+        body["include_deleted_objects"] = True
+
+    objects = []
+    latest_time = None
+    while True:
+        response = catalog_api.search_catalog_objects(body=body)
+        if not response.is_success():
+            raise Exception(f"Square catalog search failed: {response.errors}")
+
+        objects.extend(response.body.get("objects", []))
+        latest_time = response.body.get("latest_time") or latest_time
+
+        cursor = response.body.get("cursor")
+        if not cursor:
+            break
+        body["cursor"] = cursor
+
+    # Variations are stored inside their item, so refresh the items of changed variations
+    changed_item_ids = {obj["id"] for obj in objects if obj.get("type") == "ITEM"}
+    parent_item_ids = list({
+        obj.get("item_variation_data", {}).get("item_id")
+        for obj in objects
+        if obj.get("type") == "ITEM_VARIATION"
+    } - changed_item_ids - {None})
+
+    for start in range(0, len(parent_item_ids), SQUARE_CATALOG_PAGE_SIZE):
+        response = catalog_api.batch_retrieve_catalog_objects(
+            body={"object_ids": parent_item_ids[start:start + SQUARE_CATALOG_PAGE_SIZE]}
+        )
+        if not response.is_success():
+            raise Exception(f"Square catalog retrieve failed: {response.errors}")
+        objects.extend(response.body.get("objects", []))
+
+    save_square_catalog_objects(business, [obj for obj in objects if obj.get("type") in ("ITEM", "CATEGORY")])
+
+    if latest_time:
+        business.square_catalog_synced_at = datetime.fromisoformat(latest_time.replace("Z", "+00:00"))
+    else:
+        business.square_catalog_synced_at = datetime.now(timezone('UTC'))
+    business.save(update_fields=["square_catalog_synced_at"])
+    logger.info(f"Square catalog refreshed for business {business.id}: {len(objects)} changed objects")
+
+def save_square_catalog_objects(business, objects):
+    """Write catalog objects returned by Square into the snapshot."""
+    if not objects:
+        return
+
+    SquareCatalogObject.objects.bulk_create(
+        [
+            SquareCatalogObject(
+                business=business,
+                object_id=obj["id"],
+                object_type=obj["type"],
+                product_key=normalize_product_name(obj.get("item_data", {}).get("name")),
+                version=obj.get("version", 0),
+                is_deleted=obj.get("is_deleted", False),
+                data=obj
+            )
+            for obj in objects
+        ],
+        update_conflicts=True,
+        unique_fields=['business', 'object_id'],
+        update_fields=['object_type', 'product_key', 'version', 'is_deleted', 'data', 'updated_at']
+    )
+
+def _get_square_catalog_queryset(business, object_type):
+    """
+    Snapshot rows of one catalog object type.
+
+    A business without a snapshot yet loads it right away. A snapshot older than
+    SQUARE_CATALOG_MAX_AGE is served as is while a refresh runs in the background.
+    """
+    # Imported here because the task module imports this one
+    from businesses.tasks import schedule_square_catalog_refresh
+
+    synced_at = business.square_catalog_synced_at
+    if synced_at is None:
+        try:
+            refresh_square_catalog(business)
+        except Exception as e:
+            logger.error(f"Square catalog refresh error: {e}")
+    elif datetime.now(timezone('UTC')) - synced_at > SQUARE_CATALOG_MAX_AGE:
+        schedule_square_catalog_refresh(business.id)
+
+    return SquareCatalogObject.objects.filter(
+        business=business,
+        object_type=object_type,
+        is_deleted=False
+    ).order_by('id')
+
+def get_square_catalog_objects(business, object_type):
+    """Return the catalog objects of one type from the snapshot."""
+    return [catalog_object.data for catalog_object in _get_square_catalog_queryset(business, object_type)]
+
+def get_square_menu_index(business):
+    """Menu item descriptions with prices, indexed by product key for matching sales rows and AI output."""
+    if not business.square_access_token:
+        return ProductIndex()
+
+    entries = []
+    for catalog_object in _get_square_catalog_queryset(business, "ITEM").only('product_key', 'data'):
+        result = process_square_item(catalog_object.data, output_format="summary")
+        if result:
+            entries.append((catalog_object.product_key, next(iter(result.values()))))
+
+    return ProductIndex(entries, normalized=True)
+
 def get_square_menu_items(business):
     """
     Get processed Square menu items with prices and descriptions.
@@ -166,15 +475,10 @@ def get_square_menu_items(business):
             "items": {item_name: description_with_price, ...}
         }
     """
-    client = get_square_client(business)
-    if client is None:
+    if not business.square_access_token:
         return {"square_connected": False, "items": {}}
     
-    locations = get_square_locations(client)    
-    if not locations:
-        return {"square_connected": False, "items": {}}
-    
-    items = get_square_items(client)
+    items = get_square_catalog_objects(business, "ITEM")
     if not items:
         return {"square_connected": True, "items": {}}
     
@@ -222,7 +526,7 @@ def exchange_code_for_token(code):
         "redirect_uri": settings.SQUARE_REDIRECT_URI 
     }
 
-    response = requests.post(url, json=data, headers=headers)
+    response = get_square_session().post(url, json=data, headers=headers, timeout=SQUARE_HTTP_TIMEOUT)
 
     if response.status_code == 200:
         return response.json()
@@ -230,138 +534,375 @@ def exchange_code_for_token(code):
         return {"error": f"Failed to exchange code for token: {response.status_code} - {response.text}"}
 
 def fetch_and_save_square_sales_data(business):
-
     """
     Fetch sales data from Square API and save it to the database.
-    """
-    # Calculate the date range
-    end_date = datetime.now(timezone('UTC')).isoformat()
-    
-    if business.last_square_sync_at:
-        start_date = business.last_square_sync_at.isoformat()
-    else:
-        start_date = (datetime.now(timezone('UTC')) - timedelta(days=30)).isoformat()
 
-    # Get location id
+    Orders are paged through every cursor of every location, with locations
+    synced concurrently. Each page is saved in its own transaction together
+    with the cursor of the next page, so a failed sync resumes where it stopped.
+    """
     client = get_square_client(business)
     locations = get_square_locations(client)
     if not locations:
         logger.error("No Square location found.")
         return
-    location_id = locations[0].get("id") if locations else None
-    
+
+    # Businesses connected before webhooks were supported have no merchant id yet
+    if not business.square_merchant_id and locations[0].get("merchant_id"):
+        business.square_merchant_id = locations[0]["merchant_id"]
+        business.save(update_fields=["square_merchant_id"])
+
+    # Sales are bucketed into days of the business timezone, taken from Square unless set
+    if not business.timezone and locations[0].get("timezone"):
+        business.timezone = locations[0]["timezone"]
+        business.save(update_fields=["timezone"])
+
+    sync_cursors = _get_or_create_sync_cursors(business, [location["id"] for location in locations])
+    pending_cursors = [sync_cursor for sync_cursor in sync_cursors if not sync_cursor.completed]
+
+    errors = []
+    if pending_cursors:
+        max_workers = min(settings.SQUARE_SYNC_MAX_WORKERS, len(pending_cursors))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_sync_location_orders, business, sync_cursor): sync_cursor.location_id
+                for sync_cursor in pending_cursors
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.error(f"Square sync failed for location {futures[future]}: {e}")
+                    errors.append(e)
+
+    # Pages saved so far are already visible on the dashboard
+    bump_sales_cache_version(business.id)
+
+    if errors:
+        raise errors[0]
+
+    # Every location reached its last page, so the window is fully synced
+    business.last_square_sync_at = sync_cursors[0].window_end
+    business.save(update_fields=["last_square_sync_at"])
+    SquareSyncCursor.objects.filter(business=business).delete()
+
+def _get_or_create_sync_cursors(business, location_ids):
+    """Resume the unfinished sync window of a business, or start a new one."""
+    sync_cursors = list(SquareSyncCursor.objects.filter(business=business))
+
+    if sync_cursors:
+        window_start = sync_cursors[0].window_start
+        window_end = sync_cursors[0].window_end
+        logger.info(f"Resuming Square sync for business {business.id} from {window_start}")
+    else:
+        window_end = datetime.now(timezone('UTC'))
+        if business.last_square_sync_at:
+            window_start = business.last_square_sync_at
+        else:
+            window_start = window_end - timedelta(days=30)
+
+    known_locations = {sync_cursor.location_id for sync_cursor in sync_cursors}
+    new_cursors = [
+        SquareSyncCursor(
+            business=business,
+            location_id=location_id,
+            window_start=window_start,
+            window_end=window_end
+        )
+        for location_id in location_ids
+        if location_id not in known_locations
+    ]
+    if new_cursors:
+        SquareSyncCursor.objects.bulk_create(new_cursors)
+
+    return sync_cursors + new_cursors
+
+def _sync_location_orders(business, sync_cursor):
+    """Page through the orders of one location, committing each page with the next cursor."""
     headers = {
         "Authorization": f"Bearer {business.square_access_token}",
         "Content-Type": "application/json"
     }
-    
-    # Fetch order data
     url = f"{settings.SQUARE_BASE_URL}/v2/orders/search"
-    body = {
-        "location_ids": [location_id],
-        "query": {
-            "filter": {
-                "date_time_filter": {
-                    "created_at": {
-                        "start_at": start_date,
-                        "end_at": end_date
+
+    try:
+        while not sync_cursor.completed:
+            body = {
+                "location_ids": [sync_cursor.location_id],
+                "query": {
+                    "filter": {
+                        "date_time_filter": {
+                            "created_at": {
+                                "start_at": sync_cursor.window_start.isoformat(),
+                                "end_at": sync_cursor.window_end.isoformat()
+                            }
+                        }
+                    },
+                    "sort": {
+                        "sort_field": "CREATED_AT",
+                        "sort_order": "ASC"
                     }
-                }
+                },
+                "limit": SQUARE_ORDERS_PAGE_SIZE
             }
-        },
-        "sort": {
-            "sort_field": "CREATED_AT",
-            "sort_order": "DESC"
-        },
-        "limit": 1000  # Default: 500 Max: 1000
+            if sync_cursor.cursor:
+                body["cursor"] = sync_cursor.cursor
+
+            response = get_square_session().post(url, headers=headers, json=body, timeout=SQUARE_HTTP_TIMEOUT)
+
+            if response.status_code != 200:
+                logger.error(f"Error fetching sales data: {response.status_code}, {response.text}")
+                raise Exception(f"Square API error: {response.status_code}, {response.text}")
+
+            page = response.json()
+            next_cursor = page.get("cursor")
+
+            with transaction.atomic():
+                save_square_orders(business, page.get("orders", []))
+
+                sync_cursor.cursor = next_cursor
+                sync_cursor.completed = not next_cursor
+                sync_cursor.save(update_fields=["cursor", "completed", "updated_at"])
+    finally:
+        # Worker threads open their own database connection
+        connection.close()
+
+def fetch_and_save_square_orders(business, order_ids):
+    """Fetch specific Square orders (e.g. from webhooks) and apply them to the sales data points."""
+    headers = {
+        "Authorization": f"Bearer {business.square_access_token}",
+        "Content-Type": "application/json"
     }
+    url = f"{settings.SQUARE_BASE_URL}/v2/orders/batch-retrieve"
 
-    response = requests.post(url, headers=headers, json=body)
+    for start in range(0, len(order_ids), SQUARE_BATCH_RETRIEVE_LIMIT):
+        batch = order_ids[start:start + SQUARE_BATCH_RETRIEVE_LIMIT]
+        response = get_square_session().post(
+            url,
+            headers=headers,
+            json={"order_ids": batch},
+            timeout=SQUARE_HTTP_TIMEOUT
+        )
 
-    if response.status_code != 200:
-        logger.error(f"Error fetching sales data: {response.status_code}, {response.text}")
-        raise Exception(f"Square API error: {response.status_code}, {response.text}")
+        if response.status_code != 200:
+            logger.error(f"Error retrieving Square orders: {response.status_code}, {response.text}")
+            raise Exception(f"Square API error: {response.status_code}, {response.text}")
 
-    sales_data = response.json()
+        with transaction.atomic():
+            save_square_orders(business, response.json().get("orders", []))
 
-    # Prepare the sales data for saving
-    if sales_data:
-        business_timezone = timezone('Australia/Brisbane')
-        
-        sales_points = []
-                
-        items = sales_data.get('orders', [])
-        
-        for order in items:
-            # Skip orders with no line items
-            if not order.get('line_items'):
-                continue
-            
-            order_date = order.get('created_at')
-            date_obj = datetime.strptime(order_date, '%Y-%m-%dT%H:%M:%S.%fZ')
-            date_obj_local = date_obj.astimezone(business_timezone).date()
-            
-            for line_item in order.get('line_items', []):
-                name = line_item.get('name', 'Unknown Product')
-
-                quantity = int(line_item.get('quantity', 1))
-                
-                # Get the price from the line item
-                base_price_money = line_item.get('base_price_money', {})
-                price_amount = base_price_money.get('amount', 0)
-                price = Decimal(price_amount) / Decimal(100)
-
-                revenue = price * quantity
-                
-                # Skip items with zero revenue
-                if revenue <= 0:
-                    continue
-                
-                # Look for existing data point to update
-                existing = SalesDataPoint.objects.filter(
-                    business=business,
-                    date=date_obj_local,
-                    product_name=name,
-                    product_price=price,
-                    source='square'
-                ).first()
-                
-                if existing:
-                    # Update existing record
-                    existing.units_sold += quantity
-                    existing.revenue = existing.revenue + revenue
-                    sales_points.append(existing)
-                else:
-                    # Create new record
-                    sales_point = SalesDataPoint(
-                        business=business,
-                        date=date_obj_local,
-                        product_name=name,
-                        product_price=price,
-                        units_sold=quantity,
-                        revenue=revenue,
-                        source='square'
-                    )
-                    sales_points.append(sales_point)
-
-        # Save the sales data to the database within a transaction
-        if sales_points:
-            try:
-                with transaction.atomic():
-                    # Bulk update & create
-                    SalesDataPoint.objects.bulk_update(
-                        [point for point in sales_points if point.pk is not None], 
-                        ['units_sold', 'revenue', 'product_name']
-                    )
-                    SalesDataPoint.objects.bulk_create(
-                        [point for point in sales_points if point.pk is None]
-                    )
-
-                business.last_square_sync_at = datetime.now(timezone('UTC'))
-                business.save()
-
-            except Exception as e:
-                logger.error(f"Error during saving sales data or updating promotions: {e}")
-                raise
-
-    
\ No newline at end of file
+    bump_sales_cache_version(business.id)
+
+def verify_square_webhook_signature(body, signature):
+    """Check the x-square-hmacsha256-signature header of a webhook request."""
+    if not settings.SQUARE_WEBHOOK_SIGNATURE_KEY or not settings.SQUARE_WEBHOOK_URL or not signature:
+        return False
+
+    # Square signs the notification URL followed by the raw request body
+    expected_signature = base64.b64encode(hmac.new(
+        settings.SQUARE_WEBHOOK_SIGNATURE_KEY.encode(),
+        settings.SQUARE_WEBHOOK_URL.encode() + body,
+        hashlib.sha256
+    ).digest()).decode()
+
+    return hmac.compare_digest(expected_signature, signature)
+
+def _local_order_dates(orders, timezone_name):
+    """
+    Parse the created_at of a batch of orders in one vectorized pass.
+
+    Square timestamps are RFC 3339 UTC, with or without fractional seconds.
+    Returns (UTC timestamps, local calendar days) aligned with orders, NaT for
+    orders without a readable timestamp.
+    """
+    created_at = pd.to_datetime(
+        pd.Series([order.get('created_at') for order in orders], dtype=object),
+        utc=True,
+        format='ISO8601',
+        errors='coerce'
+    )
+    local_dates = created_at.dt.tz_convert(timezone_name).dt.date
+    return created_at.tolist(), local_dates.tolist()
+
+def _order_line_totals(order, order_date):
+    """
+    Sum the line items of one order by (date, product, price).
+    Cancelled orders have no totals, so applying them takes back what earlier versions added.
+    """
+    line_totals = defaultdict(lambda: [0, Decimal(0)])
+
+    if order.get('state') == 'CANCELED':
+        return line_totals
+
+    for line_item in order.get('line_items') or []:
+        name = line_item.get('name', 'Unknown Product')
+
+        quantity = int(line_item.get('quantity', 1))
+
+        # Get the price from the line item
+        base_price_money = line_item.get('base_price_money', {})
+        price_amount = base_price_money.get('amount', 0)
+        price = (Decimal(price_amount) / Decimal(100)).quantize(Decimal('0.01'))
+
+        revenue = price * quantity
+
+        # Skip items with zero revenue
+        if revenue <= 0:
+            continue
+
+        totals = line_totals[(order_date, name, price)]
+        totals[0] += quantity
+        totals[1] += revenue
+
+    return line_totals
+
+def _serialize_line_totals(line_totals):
+    return [
+        [date.isoformat(), name, str(price), quantity, str(revenue)]
+        for (date, name, price), (quantity, revenue) in line_totals.items()
+    ]
+
+def _deserialize_line_totals(rows):
+    return {
+        (date_cls.fromisoformat(date), name, Decimal(price)): (quantity, Decimal(revenue))
+        for date, name, price, quantity, revenue in rows
+    }
+
+def _predates_order_records(business, created_at, record):
+    """
+    True for orders synced before order records existed. Their totals are
+    already in the data points but were never recorded, so applying them
+    again (e.g. from an order.updated webhook) would count them twice.
+    """
+    if record is not None or not business.last_square_sync_at:
+        return False
+    return created_at < business.last_square_sync_at
+
+def save_square_orders(business, orders):
+    """
+    Apply a batch of Square orders to the sales data points.
+
+    The same order can arrive several times (polling, webhooks, later edits),
+    so each order only adds the difference between its current line totals and
+    the ones recorded when it was last applied. The differences are summed in
+    memory by (date, product, price) and added to the matching rows with one
+    upsert, so the query count doesn't depend on the number of orders.
+    """
+    # Keep only the latest version of each order in the batch
+    latest_orders = {}
+    for order in orders:
+        order_id = order.get('id')
+        if not order_id:
+            continue
+        current = latest_orders.get(order_id)
+        if current is None or order.get('version', 0) >= current.get('version', 0):
+            latest_orders[order_id] = order
+
+    if not latest_orders:
+        return
+
+    created_at, local_dates = _local_order_dates(
+        latest_orders.values(),
+        business.timezone or DEFAULT_BUSINESS_TIMEZONE
+    )
+    order_dates = dict(zip(latest_orders, zip(created_at, local_dates)))
+
+    records = {
+        record.order_id: record
+        for record in SquareOrderRecord.objects.filter(business=business, order_id__in=latest_orders)
+    }
+
+    line_deltas = defaultdict(lambda: [0, Decimal(0)])
+    updated_records = []
+
+    for order_id, order in latest_orders.items():
+        record = records.get(order_id)
+        version = order.get('version', 0)
+
+        # Already applied at this version
+        if record is not None and version <= record.version:
+            continue
+
+        order_created_at, order_date = order_dates[order_id]
+        if pd.isna(order_created_at):
+            logger.warning(f"Skipping Square order {order_id} with invalid created_at: {order.get('created_at')}")
+            continue
+
+        if _predates_order_records(business, order_created_at, record):
+            continue
+
+        line_totals = _order_line_totals(order, order_date)
+
+        for key, (quantity, revenue) in line_totals.items():
+            delta = line_deltas[key]
+            delta[0] += quantity
+            delta[1] += revenue
+
+        if record is not None:
+            for key, (quantity, revenue) in _deserialize_line_totals(record.line_totals).items():
+                delta = line_deltas[key]
+                delta[0] -= quantity
+                delta[1] -= revenue
+
+        updated_records.append(SquareOrderRecord(
+            business=business,
+            order_id=order_id,
+            version=version,
+            line_totals=_serialize_line_totals(line_totals)
+        ))
+
+    if updated_records:
+        SquareOrderRecord.objects.bulk_create(
+            updated_records,
+            update_conflicts=True,
+            unique_fields=['business', 'order_id'],
+            update_fields=['version', 'line_totals', 'updated_at']
+        )
+
+    line_deltas = {key: delta for key, delta in line_deltas.items() if delta[0] or delta[1]}
+    if not line_deltas:
+        return
+
+    _increment_square_points(business, line_deltas)
+
+def _increment_square_points(business, line_deltas):
+    """
+    Add the (units, revenue) differences to the Square rows of a business.
+
+    The sums are done by the database in one upsert, so syncs of several
+    locations running at the same time can't overwrite each other's totals.
+    Rows are written in key order, so concurrent upserts lock them in the
+    same order. Rows taken back to nothing by edited or cancelled orders are
+    deleted afterwards.
+    """
+    table = SalesDataPoint._meta.db_table
+    keys = sorted(line_deltas)
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(keys), SALES_POINT_UPSERT_BATCH_SIZE):
+            batch = keys[start:start + SALES_POINT_UPSERT_BATCH_SIZE]
+            params = []
+            for date, name, price in batch:
+                quantity, revenue = line_deltas[(date, name, price)]
+                params.extend([business.id, date, 'square', name, normalize_product_name(name), price, quantity, revenue])
+
+            cursor.execute(
+                f"""
+                INSERT INTO {table}
+                    (business_id, date, source, product_name, product_key, product_price, units_sold, revenue)
+                VALUES {", ".join(["(%s, %s, %s, %s, %s, %s, %s, %s)"] * len(batch))}
+                ON CONFLICT (business_id, date, source, product_name, product_price) DO UPDATE SET
+                    units_sold = {table}.units_sold + EXCLUDED.units_sold,
+                    revenue = {table}.revenue + EXCLUDED.revenue
+                """,
+                params
+            )
+
+    # Edited or cancelled orders can take a row back to nothing
+    SalesDataPoint.objects.filter(
+        business=business,
+        source='square',
+        units_sold__lte=0,
+        date__in={key[0] for key in keys},
+        product_name__in={key[1] for key in keys}
+    ).delete()
@@ -13,7 +13,31 @@ import SuggestionsView from "./suggestions/SuggestionsView";
 import { apiClient, useFetchData } from "@/hooks/dataHooks";
 import { PROMOTIONS_API } from "@/constants/api";
 import { Promotion } from "@/types/promotion";
-import { PromotionSuggestionsDto } from "@/types/dto";
+import {
+  PromotionGenerationJobDto,
+  PromotionSuggestionsDto,
+} from "@/types/dto";
+
+// Polling settings for the background suggestion generation
+const GENERATION_POLL_INTERVAL_MS = 2000;
+const GENERATION_POLL_MAX_ATTEMPTS = 60;
+
+const waitForGeneration = async (
+  jobId: number
+): Promise<PromotionGenerationJobDto | null> => {
+  for (let attempt = 0; attempt < GENERATION_POLL_MAX_ATTEMPTS; attempt++) {
+    await new Promise((resolve) =>
+      setTimeout(resolve, GENERATION_POLL_INTERVAL_MS)
+    );
+    const job = await apiClient.get<PromotionGenerationJobDto>(
+      PROMOTIONS_API.GENERATION_STATUS(jobId)
+    );
+    if (job.status === "completed" || job.status === "failed") {
+      return job;
+    }
+  }
+  return null;
+};
 
 const PromotionsDashboard = () => {
   const router = useRouter();
@@ -87,10 +111,27 @@ const PromotionsDashboard = () => {
 
     setIsGenerating(true);
     try {
-      await apiClient.post(PROMOTIONS_API.GENERATE, {}, { timeout: 60000 });
-      showNotification("success", "Suggestions generated successfully!");
-      await mutateSuggestions();
-      setActiveView("suggestions");
+      // Queue the generation, then wait for the background job to finish
+      const queuedJob = await apiClient.post<PromotionGenerationJobDto>(
+        PROMOTIONS_API.GENERATE,
+        {}
+      );
+      const job = await waitForGeneration(queuedJob.id);
+      if (job?.status === "failed") {
+        showNotification(
+          "error",
+          "Failed to generate suggestions. Please try again."
+        );
+      } else if (job) {
+        showNotification("success", "Suggestions generated successfully!");
+        await mutateSuggestions();
+        setActiveView("suggestions");
+      } else {
+        showNotification(
+          "success",
+          "Suggestions are still being generated. They will appear shortly."
+        );
+      }
     } catch (error) {
       console.error(error);
       showNotification(
@@ -12,6 +12,7 @@ import {
   SalesDataResponse,
   ProductPerformance,
 } from "@/types/sales";
+import { SquareSyncStatusDto } from "@/types/dto";
 import { useNotification } from "@/context/NotificationContext";
 import { Line } from "react-chartjs-2";
 import {
@@ -44,6 +45,10 @@ ChartJS.register(
 // Tab type definition
 type ChartTab = "overall" | "top" | "bottom";
 
+// Polling settings for the background Square sync
+const SYNC_POLL_INTERVAL_MS = 2000;
+const SYNC_POLL_MAX_ATTEMPTS = 30;
+
 export default function SalesDataUpload() {
   const [isMobile, setIsMobile] = useState(false);
   const [salesFile, setSalesFile] = useState<File | null>(null);
@@ -70,14 +75,40 @@ export default function SalesDataUpload() {
     return () => window.removeEventListener("resize", handleResize);
   }, []);
 
+  const waitForSquareSync = async (): Promise<SquareSyncStatusDto | null> => {
+    for (let attempt = 0; attempt < SYNC_POLL_MAX_ATTEMPTS; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, SYNC_POLL_INTERVAL_MS));
+      const syncStatus = await apiClient.get<SquareSyncStatusDto>(
+        SETTINGS_API.SALES_REFRESH
+      );
+      if (
+        syncStatus.syncStatus === "idle" ||
+        syncStatus.syncStatus === "failed"
+      ) {
+        return syncStatus;
+      }
+    }
+    return null;
+  };
+
   const handleRefresh = async () => {
     if (data?.overallSales?.squareConnected) {
       setIsProcessing(true);
       try {
-        // Fetch data from Square and update the database
+        // Queue a Square sync, then wait for the background job to finish
         await apiClient.post(SETTINGS_API.SALES_REFRESH, {});
+        const syncStatus = await waitForSquareSync();
         await mutate();
-        showNotification("success", "Sales data refreshed from Square.");
+        if (syncStatus?.syncStatus === "failed") {
+          showNotification("error", "Failed to refresh data from Square.");
+        } else if (syncStatus) {
+          showNotification("success", "Sales data refreshed from Square.");
+        } else {
+          showNotification(
+            "success",
+            "Square sync is still running. New sales will appear shortly."
+          );
+        }
       } catch (err) {
         console.error("Error refreshing data from Square:", err);
         showNotification("error", "Failed to refresh data from Square.");
@@ -75,7 +75,9 @@ export const PROMOTIONS_API = {
   CREATE: `${BASE_URL}/promotions/`,
   UPDATE: (id: string) => `${BASE_URL}/promotions/${id}/`,
   DELETE: (id: string) => `${BASE_URL}/promotions/${id}/`,
-  GENERATE: `${BASE_URL}/promotions/generate/`,
+  GENERATE: `${BASE_URL}/promotions/generate/`, // POST, queues a generation job
+  GENERATION_STATUS: (jobId: number) =>
+    `${BASE_URL}/promotions/generate/${jobId}/`, // GET
   DISMISS: (id: string) => `${BASE_URL}/promotions/${id}/dismiss/`,
 };
 
@@ -7,6 +7,7 @@ export interface Business {
   category?: string | null; // Business category (ex: "restaurant", "cafe")
   targetCustomers?: string | null; // Target customer (ex: "young professionals", "students")
   vibe?: string | null; // Business branding or mood (ex: "luxury", "casual")
+  timezone?: string | null; // IANA timezone sales are grouped by (ex: "Australia/Brisbane")
   hasSalesData?: boolean; // Whether sales data is provided
 }
 
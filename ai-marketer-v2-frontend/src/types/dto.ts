@@ -54,6 +54,49 @@ export interface PostEditorConfigDto {
 export interface SquareStatusDto {
   squareConnected: boolean; // Indicates if the Square account is linked
   businessName: string | null; // Name of the linked business
+  lastSyncAt?: string | null; // When sales were last synced from Square
+  syncStatus?: SquareSyncState; // State of the background Square sync
+  syncError?: string | null; // Error message of the last failed sync
+  cleanup?: SquareCleanupProgress | null; // Removal of the data of a previous connection
+}
+
+export type SquareSyncState = "idle" | "queued" | "running" | "failed";
+
+// Progress of the background removal of Square data after a disconnect
+export interface SquareCleanupProgress {
+  status: "queued" | "running" | "completed" | "failed";
+  deleted: number; // Rows removed so far
+  total: number | null; // Rows to remove (null until counted)
+  error?: string;
+}
+
+/**
+ * DTO for the Square sales sync status.
+ * The sync runs in the background, so clients poll this after requesting a refresh.
+ */
+export interface SquareSyncStatusDto {
+  syncStatus: SquareSyncState;
+  syncError: string | null;
+  lastSyncAt: string | null;
+}
+
+export type PromotionGenerationState =
+  | "queued"
+  | "running"
+  | "completed"
+  | "failed";
+
+/**
+ * DTO for a promotion suggestion generation job.
+ * Generation runs in the background, so clients poll the job until it completes or fails.
+ */
+export interface PromotionGenerationJobDto {
+  id: number;
+  status: PromotionGenerationState;
+  error: string | null;
+  suggestionIds: number[]; // Suggestions created by the job, once completed
+  createdAt: string;
+  completedAt: string | null;
 }
 
 /**
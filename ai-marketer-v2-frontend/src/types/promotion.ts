@@ -12,6 +12,29 @@ export interface ProductWithCategory {
   category: ProductCategory;
 }
 
+// Sales of one target product during a promotion
+export interface PromotionProductMetrics {
+  name: string;
+  soldCount: number;
+  baselineUnits: number | null; // Average units of the look-back periods
+  salesChange: number;
+  revenue: number;
+}
+
+// Sales effect of a promotion against the periods before it
+export interface PromotionMetrics {
+  soldCount: number | null;
+  salesChange: number | null; // Units sold above the baseline
+  baselineUnits: number | null;
+  liftPercent: number | null;
+  revenue: number | null;
+  baselineRevenue: number | null;
+  revenueLift: number | null;
+  confidence: number | null; // 0-1, how unlikely the change is from usual variation
+  productBreakdown: PromotionProductMetrics[];
+  computedAt: string | null; // null when computed on request
+}
+
 // Represents a promotional campaign consisting of multiple posts
 export type Promotion = {
   id: string; // Unique promotion ID
@@ -24,6 +47,7 @@ export type Promotion = {
   status: string; // ex: "upcoming", "ongoing"
   soldCount?: number; // Number of units sold
   salesChange?: number;
+  metrics?: PromotionMetrics;
   productNames: string[];
   products: ProductWithCategory[]; // Products with category information
   type: string;